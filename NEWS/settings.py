@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     # custom app
     "newspaper",
     "api",
+    "report",
 ]
 
 MIDDLEWARE = [
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "newspaper.page_cache.AnonymousPageCacheMiddleware",
 ]
 
 ROOT_URLCONF = "NEWS.urls"
@@ -96,6 +98,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The local memory cache belongs to each process: with several web processes,
+# or changes made by management commands, what one process invalidates stays
+# cached in the others. The page cache, post list validators, home section
+# warming, navigation stats and buffered view counts need a cache shared by
+# all processes (memcached, redis) in production; the page cache turns itself
+# off without one (see PAGE_CACHE_PER_PROCESS).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -163,3 +181,87 @@ SUMMERNOTE_CONFIG = {
         "height": "480",
     }
 }
+
+# Post views are buffered in this cache and written to the database at most
+# once every VIEW_COUNT_FLUSH_INTERVAL seconds (0 writes on every hit).
+# With the local memory cache every web process buffers and flushes its own
+# views on its requests, and `manage.py flush_view_counts` refuses to run (it
+# would see an empty buffer). Use a shared cache (memcached/redis) in
+# production so that all workers share one buffer the command can flush.
+VIEW_COUNT_CACHE = "default"
+VIEW_COUNT_FLUSH_INTERVAL = 30
+# Seconds a reader (address and user agent) counts once per post.
+VIEW_COUNT_DEDUPE_WINDOW = 30 * 60
+
+# Dotted path of the full-text search backend, None picks one for the
+# database vendor (see newspaper/search.py).
+SEARCH_BACKEND = None
+
+# Navigation (categories, top categories, tags) is cached per version and
+# invalidated on post/category/tag changes; the timeout bounds how stale the
+# "top categories by views" ordering can get. Every miss logs the hit/miss
+# counters at INFO level (logger newspaper.navigation_context_processor).
+NAVIGATION_CACHE_TIMEOUT = 300
+
+# Seconds each home page section stays in the render cache. Publishing,
+# updating or deleting a post invalidates all of them right away.
+HOME_SECTION_CACHE_TTL = {
+    "trending": 600,
+    "weekly": 600,
+    "whats_new": 600,
+    "weekly2": 3600,
+    "recent": 600,
+}
+
+# Widths (px) of the resized copies generated for every Post.featured_image
+POST_IMAGE_SIZES = {
+    "thumb": 160,
+    "card": 480,
+    "hero": 1200,
+}
+
+# Seconds anonymous readers are served the home, post, post list, category and
+# tag pages from the cache (newspaper/page_cache.py). Changes to a post purge
+# the pages showing it right away, the navigation sidebars may lag this long.
+PAGE_CACHE_TIMEOUT = 300
+# The page cache needs a shared cache, set this to use the local memory cache
+# anyway on a single-process server (runserver).
+PAGE_CACHE_PER_PROCESS = False
+
+# Number of related posts precomputed for, and shown on, every post detail
+# page (newspaper/related.py).
+RELATED_POSTS_COUNT = 4
+
+# New comments are queued and written in batches (newspaper/comment_queue.py):
+# "sqlite" queues them in COMMENT_QUEUE_PATH, shared by all processes,
+# "memory" in this process only, None writes them in the request. Queued
+# comments are written by `manage.py process_comment_queue`, which must run
+# next to the web server: without it the comments stay queued. Setting
+# COMMENT_QUEUE_WORKER_THREAD writes them from a thread of the web process
+# instead: only for single-process servers (runserver, or with the "memory"
+# backend), a multi-process server would run one worker per process.
+COMMENT_QUEUE_BACKEND = "sqlite"
+COMMENT_QUEUE_PATH = BASE_DIR / "comment_queue.sqlite3"
+COMMENT_QUEUE_WORKER_THREAD = False
+COMMENT_QUEUE_BATCH_SIZE = 200
+# seconds an idle worker waits before looking at the queue again
+COMMENT_QUEUE_INTERVAL = 1.0
+
+# Post views per hour and per day (report/store.py). Hourly buckets are kept
+# this many days, long enough to roll every day up; daily rows are kept
+# REPORT_DAILY_RETENTION_DAYS.
+REPORT_HOURLY_RETENTION_DAYS = 14
+REPORT_DAILY_RETENTION_DAYS = 730
+
+# Newsletter digests (newspaper/newsletter.py), sent by
+# `manage.py send_newsletter` through EMAIL_BACKEND: NEWSLETTER_THREADS
+# threads each send a batch of NEWSLETTER_BATCH_SIZE messages over one
+# connection. Failed deliveries are retried by the next run, up to
+# NEWSLETTER_MAX_ATTEMPTS times.
+NEWSLETTER_FROM_EMAIL = "AZNews <newsletter@localhost>"
+# prefix of the links in the digest
+NEWSLETTER_SITE_URL = "http://localhost:8000"
+NEWSLETTER_MAX_POSTS = 10
+NEWSLETTER_BATCH_SIZE = 100
+NEWSLETTER_THREADS = 4
+NEWSLETTER_MAX_ATTEMPTS = 3
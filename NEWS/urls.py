@@ -23,6 +23,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("summernote/", include("django_summernote.urls")),
     path("api/v1/", include("api.urls")),
+    path("reports/", include("report.urls")),
     path("", include("newspaper.urls")),
     path("accounts/login/", CustomLogin.as_view(), name="login"),
     # path("accounts/login/", LoginView.as_view(), name="login"),
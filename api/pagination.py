@@ -0,0 +1,33 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class PostCursorPagination(CursorPagination):
+    """Newest first; cursors seek on published_at instead of OFFSET/COUNT."""
+
+    ordering = ("-published_at", "-id")
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class DraftCursorPagination(PostCursorPagination):
+    ordering = ("-created_at", "-id")
+
+
+class CommentCursorPagination(CursorPagination):
+    """Latest comments first, the "load more" of the post detail page."""
+
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class SearchPagination(LimitOffsetPagination):
+    default_limit = 10
+    max_limit = 50
+
+
+class ReportPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 500
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import Group, User
 from rest_framework import serializers
 
+from newspaper import view_counter
 from newspaper.models import Category, Comment, Contact, NewsLetter, Post, Tag
+from report.models import AuthorReport, CategoryReport, TagReport
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -45,10 +47,21 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class PostSerializer(serializers.ModelSerializer):
     comments = serializers.SerializerMethodField()
+    views_count = serializers.SerializerMethodField()
 
     def get_comments(self, obj):
-        comments = Comment.objects.filter(post=obj).values()[:10]
-        return comments
+        comments = getattr(obj, "prefetched_comments", None)
+        if comments is None:  # not fetched with Post.objects.with_latest_comments()
+            comments = obj.comment_set.order_by("-created_at", "-id")[:10]
+        fields = Comment._meta.concrete_fields
+        return [
+            {field.attname: getattr(comment, field.attname) for field in fields}
+            for comment in comments
+        ]
+
+    def get_views_count(self, obj):
+        # include the views still buffered by the view counter
+        return obj.views_count + view_counter.pending(obj.pk)
 
     class Meta:
         model = Post
@@ -64,12 +77,12 @@ class PostSerializer(serializers.ModelSerializer):
             "category",
             "tag",
             "author",
+            "comment_count",
             "comments",
         ]
         extra_kwargs = {
             "published_at": {"read_only": True},
             "author": {"read_only": True},
-            "views_count": {"read_only": True},
         }
 
     def validate(self, data):
@@ -77,6 +90,44 @@ class PostSerializer(serializers.ModelSerializer):
         return data
 
 
+class PostListSerializer(PostSerializer):
+    """PostSerializer for list endpoints: the excerpt instead of the content."""
+
+    class Meta(PostSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "excerpt",
+            "featured_image",
+            "views_count",
+            "status",
+            "published_at",
+            "category",
+            "tag",
+            "author",
+            "comment_count",
+            "comments",
+        ]
+
+
+class PostSearchSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(source="search_rank")
+    snippet = serializers.CharField()
+
+    class Meta:
+        model = Post
+        fields = [
+            "id",
+            "title",
+            "featured_image",
+            "published_at",
+            "category",
+            "tag",
+            "rank",
+            "snippet",
+        ]
+
+
 class TopCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -103,3 +154,37 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = "__all__"
+
+
+REPORT_FIELDS = [
+    "name",
+    "posts",
+    "views",
+    "comments",
+    "last_published_at",
+    "refreshed_at",
+]
+
+
+class CategoryReportSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="category.name")
+
+    class Meta:
+        model = CategoryReport
+        fields = ["category", *REPORT_FIELDS]
+
+
+class AuthorReportSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="author.username")
+
+    class Meta:
+        model = AuthorReport
+        fields = ["author", *REPORT_FIELDS]
+
+
+class TagReportSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="tag.name")
+
+    class Meta:
+        model = TagReport
+        fields = ["tag", *REPORT_FIELDS]
@@ -1,3 +1,125 @@
+from datetime import timedelta
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from newspaper import view_counter
+from newspaper.models import Category, Comment, NewsLetter, Tag
+from newspaper.tests import make_post
+
+
+class PostListQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="editor")
+        self.category = Category.objects.create(name="politics")
+        self.tags = [
+            Tag.objects.create(name="election"),
+            Tag.objects.create(name="vote"),
+        ]
+
+    def create_posts(self, count, comments_per_post=12):
+        for i in range(count):
+            post = make_post(f"post {i}", author=self.author, category=self.category)
+            post.tag.set(self.tags)
+            Comment.objects.bulk_create(
+                Comment(
+                    post=post,
+                    message=f"comment {j}",
+                    name="reader",
+                    email="r@example.com",
+                )
+                for j in range(comments_per_post)
+            )
+
+    def count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_returns_latest_ten_comments(self):
+        self.create_posts(1)
+        [post] = self.client.get("/api/v1/posts/").json()["results"]
+        self.assertEqual(len(post["comments"]), 10)
+        self.assertEqual(post["comments"][0]["message"], "comment 11")
+        self.assertEqual(len(post["tag"]), 2)
+
+    def test_list_query_count_is_constant_in_page_size(self):
+        urls = [
+            "/api/v1/posts/",
+            f"/api/v1/post-by-category/{self.category.pk}/",
+            f"/api/v1/post-by-tag/{self.tags[0].pk}/",
+        ]
+        self.create_posts(2)
+        baseline = [self.count_list_queries(url) for url in urls]
+
+        self.create_posts(8)
+        self.assertEqual([self.count_list_queries(url) for url in urls], baseline)
+
+
+class PostRetrieveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = make_post()
+        self.client.force_login(self.post.author)
+
+    def views(self):
+        self.post.refresh_from_db()
+        return self.post.views_count + view_counter.pending(self.post.pk)
+
+    def test_reads_are_counted_once_per_reader(self):
+        url = f"/api/v1/posts/{self.post.pk}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for _ in range(3):  # polling revalidations
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.views(), 1)
+
+        # a revalidation answered with 304 is a read too
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"], REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.views(), 2)
+
+        self.assertEqual(self.client.get("/api/v1/posts/999/").status_code, 404)
+        self.assertEqual(self.views(), 2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="boss", is_staff=True)
+        for email in ["old@example.com", "new@example.com"]:
+            NewsLetter.objects.create(email=email)
+        NewsLetter.objects.filter(email="old@example.com").update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+
+    def test_export_is_staff_only(self):
+        response = self.client.get("/api/v1/newsletter/export/")
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_export_streams_the_rows_in_the_range(self):
+        self.client.force_login(self.staff)
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(f"/api/v1/newsletter/export/?since={since}")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,email,created_at")
+        emails = [line.split(",")[1] for line in lines[1:]]
+        self.assertEqual(emails, ["new@example.com"])
+
+        response = self.client.get("/api/v1/newsletter/export/?output=ndjson")
+        content = b"".join(response.streaming_content)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 2)
 
-# Create your tests here.
+        response = self.client.get("/api/v1/newsletter/export/?since=yesterday")
+        self.assertEqual(response.status_code, 400)
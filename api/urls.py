@@ -11,12 +11,22 @@ router.register("categories", views.CategoryViewSet)
 router.register("posts", views.PostViewSet)
 router.register("contact-us", views.ContactViewSet)
 router.register("newsletter", views.NewsLetterViewSet)
+router.register(
+    "reports/categories", views.CategoryReportViewSet, basename="category-report"
+)
+router.register("reports/authors", views.AuthorReportViewSet, basename="author-report")
+router.register("reports/tags", views.TagReportViewSet, basename="tag-report")
 # router.register("comments/<int:post_id>", views.CommentViewSet)
 
 # Wire up our API using automatic URL routing.
 # Additionally, we include login URLs for the browsable API.
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "reports/",
+        views.ReportRootViewSet.as_view(),
+        name="reports",
+    ),
     path(
         "draft-list/",
         views.DraftListViewSet.as_view(),
@@ -42,6 +52,11 @@ urlpatterns = [
         views.PostByTagListViewSet.as_view(),
         name="post-by-tag",
     ),
+    path(
+        "search/",
+        views.PostSearchViewSet.as_view(),
+        name="post-search",
+    ),
     path(
         "post/<int:post_id>/comments/",
         views.PostCommentViewSet.as_view(),
@@ -1,24 +1,43 @@
 from django.contrib.auth.models import Group, User
 from django.db.models import Case, F, Q, Sum, When
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import exceptions, permissions, status, viewsets
-from rest_framework.generics import ListAPIView
+from rest_framework.decorators import action
+from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
+from api.pagination import (
+    CommentCursorPagination,
+    DraftCursorPagination,
+    PostCursorPagination,
+    ReportPagination,
+    SearchPagination,
+)
 from api.serializers import (
+    AuthorReportSerializer,
+    CategoryReportSerializer,
     CategorySerializer,
     CommentSerializer,
     ContactSerializer,
     GroupSerializer,
     NewsLetterSerializer,
+    PostListSerializer,
     PostPublishSerializer,
+    PostSearchSerializer,
     PostSerializer,
+    TagReportSerializer,
     TagSerializer,
     TopCategorySerializer,
     UserSerializer,
 )
+from newspaper import comment_queue, conditional, exports, search, view_counter
+from newspaper.home_cache import bump_content_generation
 from newspaper.models import Category, Comment, Contact, NewsLetter, Post, Tag
+from report.models import AuthorReport, CategoryReport, TagReport
 
 published_and_active = Q(status="published", published_at__isnull=False)
 
@@ -84,6 +103,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
+@method_decorator(
+    condition(
+        etag_func=conditional.api_post_list_etag,
+        last_modified_func=conditional.post_list_last_modified,
+    ),
+    name="list",
+)
 class PostViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows Post to be viewed or edited.
@@ -92,6 +118,18 @@ class PostViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.filter(published_and_active).order_by("-published_at")
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return queryset.for_list().with_latest_comments()
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return PostListSerializer
+        return super().get_serializer_class()
 
     def get_permissions(self):
         if self.action == "list" or self.action == "retrieve":
@@ -100,11 +138,30 @@ class PostViewSet(viewsets.ModelViewSet):
             ]
         return super().get_permissions()
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bump_content_generation()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_content_generation()
+
     def retrieve(self, request, *args, **kwargs):
-        obj = self.get_object()
-        obj.views_count += 1
-        obj.save()
-        return super().retrieve(request, *args, **kwargs)
+        # a revalidation answered with 304 is a read too, count it first;
+        # once per reader and VIEW_COUNT_DEDUPE_WINDOW like the post pages
+        if conditional.post_state(request, kwargs["pk"]) is not None:
+            view_counter.count_view(int(kwargs["pk"]), view_counter.reader(request))
+        return self.conditional_retrieve(request, *args, **kwargs)
+
+    @method_decorator(
+        condition(
+            etag_func=conditional.api_post_detail_etag,
+            last_modified_func=conditional.post_detail_last_modified,
+        )
+    )
+    def conditional_retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
 
 
 class TopCategoriesListViewSet(ListAPIView):
@@ -147,12 +204,17 @@ class PostByCategoryListViewSet(ListAPIView):
     """
 
     permission_classes = [permissions.AllowAny]
-    serializer_class = PostSerializer
+    serializer_class = PostListSerializer
+    pagination_class = PostCursorPagination
 
     def get_queryset(self):
-        queryset = Post.objects.filter(
-            published_and_active,
-            category=self.kwargs["cat_id"],
+        queryset = (
+            Post.objects.filter(
+                published_and_active,
+                category=self.kwargs["cat_id"],
+            )
+            .for_list()
+            .with_latest_comments()
         )
         return queryset
 
@@ -163,17 +225,62 @@ class PostByTagListViewSet(ListAPIView):
     """
 
     permission_classes = [permissions.AllowAny]
-    serializer_class = PostSerializer
+    serializer_class = PostListSerializer
+    pagination_class = PostCursorPagination
 
     def get_queryset(self):
-        queryset = Post.objects.filter(
-            published_and_active,
-            tag=self.kwargs["tag_id"],
+        queryset = (
+            Post.objects.filter(
+                published_and_active,
+                tag=self.kwargs["tag_id"],
+            )
+            .for_list()
+            .with_latest_comments()
         )
         return queryset
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class PostSearchViewSet(ListAPIView):
+    """
+    Full-text search over published Posts, ranked best match first.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    serializer_class = PostSearchSerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "")
+        return search.get_backend().search(query)
+
+
+class ExportMixin:
+    """
+    ``GET <list url>/export/?output=csv|ndjson&since=<date>&until=<date>``
+    streams the records created in ``[since, until)`` to staff, see
+    newspaper.exports.
+    """
+
+    export_name = None
+
+    @action(detail=False, permission_classes=[permissions.IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        output = request.query_params.get("output", "csv")
+        if output not in exports.FORMATS:
+            raise exceptions.ValidationError(
+                {"output": f"Choose one of {', '.join(exports.FORMATS)}."}
+            )
+        bounds = {}
+        for bound in ("since", "until"):
+            if request.query_params.get(bound):
+                try:
+                    bounds[bound] = exports.parse_moment(request.query_params[bound])
+                except ValueError as error:
+                    raise exceptions.ValidationError({bound: str(error)})
+        return exports.export_response(self.export_name, output, **bounds)
+
+
+class ContactViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Contact Us to be viewed or created.
     """
@@ -181,6 +288,7 @@ class ContactViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
+    export_name = "contact"
 
     def get_permissions(self):
         if self.action == "create":
@@ -193,7 +301,7 @@ class ContactViewSet(viewsets.ModelViewSet):
         raise exceptions.MethodNotAllowed(request.method)  # raise an exception
 
 
-class NewsLetterViewSet(viewsets.ModelViewSet):
+class NewsLetterViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows NewsLetter Us to be viewed or created.
     """
@@ -201,6 +309,13 @@ class NewsLetterViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     queryset = NewsLetter.objects.all()
     serializer_class = NewsLetterSerializer
+    export_name = "newsletter"
+
+    def perform_create(self, serializer):
+        # subscribing an address again returns its subscriber
+        serializer.instance, _ = NewsLetter.objects.subscribe(
+            serializer.validated_data["email"]
+        )
 
     def get_permissions(self):
         if self.action == "create":
@@ -219,8 +334,14 @@ class DraftListViewSet(ListAPIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Post.objects.filter(published_at__isnull=True).order_by("-created_at")
-    serializer_class = PostSerializer
+    queryset = (
+        Post.objects.filter(published_at__isnull=True)
+        .for_list()
+        .with_latest_comments()
+        .order_by("-created_at")
+    )
+    serializer_class = PostListSerializer
+    pagination_class = DraftCursorPagination
 
 
 class PostPublishViewSet(APIView):
@@ -240,6 +361,7 @@ class PostPublishViewSet(APIView):
             post = Post.objects.get(id=data["post"])
             post.published_at = timezone.now()
             post.save()
+            bump_content_generation()
 
             serialized_post = PostSerializer(post)
             return Response(
@@ -251,28 +373,85 @@ class PostPublishViewSet(APIView):
             )
 
 
-class PostCommentViewSet(APIView):
+class PostCommentViewSet(GenericAPIView):
     """
     API endpoint that allows Comment to be viewed or created in specified post.
+    Comments are listed latest first, a page at a time.
     """
 
     permission_classes = [permissions.AllowAny]
     serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
 
     def get(self, request, post_id, *args, **kwargs):
-        comments = Comment.objects.filter(post=post_id).order_by("-created_at")
+        comments = self.paginate_queryset(Comment.objects.filter(post=post_id))
         serializer = self.serializer_class(comments, many=True)
-        return Response(
-            serializer.data,
-            status=status.HTTP_200_OK,
-        )
+        return self.get_paginated_response(serializer.data)
 
     def post(self, request, post_id, *args, **kwargs):
         request.data.update({"post": post_id})
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            # written in the background, see newspaper.comment_queue
+            comment = Comment(**serializer.validated_data)
+            comment_queue.enqueue(request, comment)
+            if comment.pk is None:
+                return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
             return Response(
-                serializer.data,
+                self.serializer_class(comment).data,
                 status=status.HTTP_201_CREATED,
             )
+
+
+class CategoryReportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint with the posts, views and comments of every category, most
+    viewed first. Refreshed by the refresh_reports command.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    queryset = CategoryReport.objects.select_related("category").order_by(
+        "-views", "pk"
+    )
+    serializer_class = CategoryReportSerializer
+    pagination_class = ReportPagination
+
+
+class AuthorReportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint with the posts, views and comments of every author, most
+    viewed first. Refreshed by the refresh_reports command.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    queryset = AuthorReport.objects.select_related("author").order_by("-views", "pk")
+    serializer_class = AuthorReportSerializer
+    pagination_class = ReportPagination
+
+
+class TagReportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint with the posts, views and comments of every tag, most viewed
+    first. Refreshed by the refresh_reports command.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    queryset = TagReport.objects.select_related("tag").order_by("-views", "pk")
+    serializer_class = TagReportSerializer
+    pagination_class = ReportPagination
+
+
+class ReportRootViewSet(APIView):
+    """
+    API endpoint listing the reports.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(
+            {
+                kind: reverse(f"{kind}-report-list", request=request)
+                for kind in ["category", "author", "tag"]
+            }
+        )
@@ -1,7 +1,16 @@
 from django.contrib import admin
 from django_summernote.admin import SummernoteModelAdmin
 
-from newspaper.models import Category, Comment, Contact, NewsLetter, Post, Tag
+from newspaper.models import (
+    Category,
+    Comment,
+    Contact,
+    NewsLetter,
+    NewsletterDelivery,
+    NewsletterIssue,
+    Post,
+    Tag,
+)
 
 admin.site.register(Category)
 admin.site.register(Tag)
@@ -10,6 +19,20 @@ admin.site.register(Contact)
 admin.site.register(Comment)
 
 
+class NewsletterIssueAdmin(admin.ModelAdmin):
+    list_display = ["subject", "since", "until", "sent_at"]
+
+
+class NewsletterDeliveryAdmin(admin.ModelAdmin):
+    list_display = ["email", "issue", "status", "attempts", "sent_at"]
+    list_filter = ["status", "issue"]
+    search_fields = ["email"]
+
+
+admin.site.register(NewsletterIssue, NewsletterIssueAdmin)
+admin.site.register(NewsletterDelivery, NewsletterDeliveryAdmin)
+
+
 class PostAdmin(SummernoteModelAdmin):
     list_display = ["title", "category", "author"]
     date_hierarchy = "published_at"
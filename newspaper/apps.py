@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NewspaperConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "newspaper"
+
+    def ready(self):
+        from newspaper import signals  # noqa: F401
@@ -0,0 +1,392 @@
+"""
+Write-behind queue for new comments.
+
+Comment views validate the comment and put it in a queue instead of writing
+it; a worker takes the queued comments in batches and writes each batch with
+one ``bulk_create`` and one ``comment_count`` update per post, in a single
+transaction. A burst of comments on one post then costs a few short write
+transactions instead of one per comment. ``settings.COMMENT_QUEUE_BACKEND``:
+
+    "sqlite"  -> a table in its own SQLite file (COMMENT_QUEUE_PATH), shared
+                 by every process and kept across restarts
+    "memory"  -> a queue in this process, for single-process deployments;
+                 queued comments are lost on restart
+    None      -> no queue, comments are written in the request
+
+The worker runs as ``manage.py process_comment_queue``. With
+``COMMENT_QUEUE_WORKER_THREAD`` set it runs in a thread of the web process
+instead, which is only meant for single-process servers (runserver, or the
+"memory" backend): a multi-process server would start one worker per process.
+Comments are taken with a lease and only removed from the queue once written.
+A batch taken again after a worker died in between is written once: every
+queued comment carries a token, stored in ``Comment.queue_token``, and the
+comments already written are skipped. Two workers writing the same batch at
+once (a lease ran out mid-write) are kept apart by the unique
+``queue_token``: whatever the other wrote first is neither inserted nor
+counted again.
+
+Until its comment is written, the author sees it on the post page from the
+session (``pending_comments()``). A non-empty session also keeps the page out
+of the anonymous page cache. The worker purges the pages of the posts it
+wrote to, but in a cache of its own process unless the cache is shared; so
+once ``pending_comments()`` sees comments written it purges them from the web
+process too.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from newspaper import page_cache
+from newspaper.models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "pending_comments"
+LEASE = 60  # seconds a worker may hold taken comments before others retry them
+FIELDS = ("post_id", "name", "email", "message")
+
+# sent once a batch is written, and again by the web process seeing queued
+# comments of its session written, with post_ids=[ids of the posts commented on]
+comments_written = Signal()
+
+
+class SQLiteQueue:
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS comment_queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL, "
+                "leased_until REAL NOT NULL DEFAULT 0)"
+            )
+            self.local.connection = connection
+        return connection
+
+    def put(self, payload):
+        cursor = self.connection().execute(
+            "INSERT INTO comment_queue (payload) VALUES (?)", [json.dumps(payload)]
+        )
+        return cursor.lastrowid
+
+    def take(self, limit):
+        """Lease up to ``limit`` queued items, oldest first."""
+        connection = self.connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, payload FROM comment_queue WHERE leased_until < ? "
+                "ORDER BY id LIMIT ?",
+                [now, limit],
+            ).fetchall()
+            connection.executemany(
+                "UPDATE comment_queue SET leased_until = ? WHERE id = ?",
+                [(now + LEASE, item_id) for item_id, _ in rows],
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return [(item_id, json.loads(payload)) for item_id, payload in rows]
+
+    def done(self, ids):
+        self.connection().executemany(
+            "DELETE FROM comment_queue WHERE id = ?", [(item_id,) for item_id in ids]
+        )
+
+    def release(self, ids):
+        self.connection().executemany(
+            "UPDATE comment_queue SET leased_until = 0 WHERE id = ?",
+            [(item_id,) for item_id in ids],
+        )
+
+    def queued(self, ids):
+        """The ``ids`` still in the queue."""
+        ids = list(ids)
+        if not ids:
+            return set()
+        rows = self.connection().execute(
+            "SELECT id FROM comment_queue WHERE id IN (%s)" % ", ".join("?" * len(ids)),
+            ids,
+        )
+        return {item_id for item_id, in rows}
+
+    def __len__(self):
+        return (
+            self.connection()
+            .execute("SELECT COUNT(*) FROM comment_queue")
+            .fetchone()[0]
+        )
+
+
+class MemoryQueue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}  # {id: (payload, leased until)}, in insertion order
+        self.ids = itertools.count(1)
+
+    def put(self, payload):
+        with self.lock:
+            item_id = next(self.ids)
+            self.items[item_id] = (payload, 0)
+        return item_id
+
+    def take(self, limit):
+        now = time.time()
+        with self.lock:
+            taken = [
+                (item_id, payload)
+                for item_id, (payload, leased_until) in self.items.items()
+                if leased_until < now
+            ][:limit]
+            for item_id, payload in taken:
+                self.items[item_id] = (payload, now + LEASE)
+        return taken
+
+    def done(self, ids):
+        with self.lock:
+            for item_id in ids:
+                self.items.pop(item_id, None)
+
+    def release(self, ids):
+        with self.lock:
+            for item_id in ids:
+                if item_id in self.items:
+                    self.items[item_id] = (self.items[item_id][0], 0)
+
+    def queued(self, ids):
+        with self.lock:
+            return {item_id for item_id in ids if item_id in self.items}
+
+    def __len__(self):
+        return len(self.items)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue():
+    """The queue of ``settings.COMMENT_QUEUE_BACKEND``, None without one."""
+    backend = settings.COMMENT_QUEUE_BACKEND
+    if backend is None:
+        return None
+    key = (backend, str(settings.COMMENT_QUEUE_PATH))
+    with _queues_lock:
+        if key not in _queues:
+            if backend == "sqlite":
+                _queues[key] = SQLiteQueue(settings.COMMENT_QUEUE_PATH)
+            elif backend == "memory":
+                _queues[key] = MemoryQueue()
+            else:
+                raise ValueError(f"Unknown comment queue backend {backend!r}.")
+        return _queues[key]
+
+
+def enqueue(request, comment):
+    """
+    Queue the unsaved, validated ``comment`` and remember it in the session
+    of its author. Without a queue the comment is saved right away.
+    """
+    queue = get_queue()
+    if queue is None:
+        comment.save()
+        return
+    payload = {field: getattr(comment, field) for field in FIELDS}
+    payload["token"] = str(uuid.uuid4())
+    item_id = queue.put(payload)
+    pending = request.session.get(SESSION_KEY, [])
+    pending.append(
+        {
+            "id": item_id,
+            "post_id": comment.post_id,
+            "name": comment.name,
+            "message": comment.message,
+            "at": timezone.now().isoformat(),
+        }
+    )
+    request.session[SESSION_KEY] = pending
+    if settings.COMMENT_QUEUE_WORKER_THREAD:
+        start_worker()
+
+
+@dataclass
+class PendingComment:
+    name: str
+    message: str
+    created_at: datetime
+    pending: bool = True
+
+
+def pending_ids(request):
+    """Queue ids of the comments of this session not written yet."""
+    if request.session.is_empty():
+        return []
+    return [comment["id"] for comment in request.session.get(SESSION_KEY, [])]
+
+
+def pending_comments(request, post_id):
+    """
+    The comments the author of ``request`` made on ``post_id`` which are
+    still queued, newest first. Written comments are dropped from the session.
+    """
+    queue = get_queue()
+    pending = [] if request.session.is_empty() else request.session.get(SESSION_KEY)
+    if not pending:
+        return []
+    queued = queue.queued(c["id"] for c in pending) if queue is not None else set()
+    if len(queued) < len(pending):
+        written_to = {c["post_id"] for c in pending if c["id"] not in queued}
+        pending = [c for c in pending if c["id"] in queued]
+        if pending:
+            request.session[SESSION_KEY] = pending
+        else:
+            del request.session[SESSION_KEY]
+        purge(written_to)
+    return [
+        PendingComment(c["name"], c["message"], datetime.fromisoformat(c["at"]))
+        for c in reversed(pending)
+        if c["post_id"] == post_id
+    ]
+
+
+def write(payloads):
+    """
+    Write the comments ``payloads``, returns the number written. Comments
+    already written, from an earlier delivery of the same batch, are skipped.
+    """
+    comments = {}
+    for payload in payloads:
+        payload = dict(payload)
+        token = payload.pop("token", None)
+        # a comment queued before the tokens gets a new one
+        token = uuid.UUID(token) if token else uuid.uuid4()
+        comments[token] = Comment(queue_token=token, **payload)
+    with transaction.atomic():
+        # posts deleted while their comments were queued are left out
+        posts = set(
+            Post.objects.filter(
+                pk__in={c.post_id for c in comments.values()}
+            ).values_list("pk", flat=True)
+        )
+        written = written_tokens(list(comments))
+        comments = [
+            comment
+            for token, comment in comments.items()
+            if token not in written and comment.post_id in posts
+        ]
+        if not comments:
+            return 0
+        try:
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+        except IntegrityError:
+            # another worker wrote some of them since: insert one by one and
+            # count only the comments inserted here
+            comments = [comment for comment in comments if insert(comment)]
+        # bulk_create skips Comment.save(), which maintains the counts
+        posts_by_count = defaultdict(list)
+        for post_id, count in Counter(c.post_id for c in comments).items():
+            posts_by_count[count].append(post_id)
+        for count, post_ids in posts_by_count.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                comment_count=F("comment_count") + count
+            )
+    purge({c.post_id for c in comments})
+    return len(comments)
+
+
+def written_tokens(tokens):
+    return set(
+        Comment.objects.filter(queue_token__in=tokens).values_list(
+            "queue_token", flat=True
+        )
+    )
+
+
+def insert(comment):
+    """Insert ``comment`` unless its token is taken, returns whether it was."""
+    try:
+        with transaction.atomic():
+            Comment.objects.bulk_create([comment])
+    except IntegrityError:
+        return False
+    return True
+
+
+def purge(post_ids):
+    """Purge the pages of ``post_ids`` after comments were written to them."""
+    if post_ids:
+        page_cache.purge(f"post:{post_id}" for post_id in post_ids)
+        comments_written.send(sender=Comment, post_ids=list(post_ids))
+
+
+def drain(batch_size=None, queue=None):
+    """Write one batch of queued comments, returns the number taken."""
+    if queue is None:
+        queue = get_queue()
+    if queue is None:
+        return 0
+    batch = queue.take(batch_size or settings.COMMENT_QUEUE_BATCH_SIZE)
+    if not batch:
+        return 0
+    ids = [item_id for item_id, _ in batch]
+    try:
+        write(payload for _, payload in batch)
+    except Exception:
+        queue.release(ids)
+        raise
+    queue.done(ids)
+    return len(ids)
+
+
+def run_worker(interval=None, batch_size=None, stop=None):
+    """Drain the queue until ``stop`` is set, sleeping ``interval`` when empty."""
+    interval = settings.COMMENT_QUEUE_INTERVAL if interval is None else interval
+    while stop is None or not stop.is_set():
+        try:
+            taken = drain(batch_size)
+        except Exception:
+            logger.exception("Cannot write queued comments")
+            taken = 0
+        if not taken:
+            close_old_connections()
+            _wakeup.wait(interval)
+            _wakeup.clear()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def start_worker():
+    """Run ``run_worker()`` in a thread of this process, and wake it up."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=run_worker, name="comment-queue", daemon=True
+            )
+            _worker.start()
+    _wakeup.set()
@@ -0,0 +1,123 @@
+"""
+Validators for conditional GET on post pages and the posts API.
+
+ETag and Last-Modified are computed before any post is loaded or anything
+rendered, so a revalidation that ends in a 304 costs little: a post is
+validated by one indexed query of its ``updated_at``, ``comment_count`` and
+latest comment; the post lists by a version in the cache, the time of the
+latest change to a post, its tags or its comments (``newspaper.signals``
+bumps it), without any query. Like the page cache, list validators need a
+cache shared by the processes changing posts and comments.
+View counts are not part of the validators: they are written with ``update()``
+which does not touch ``updated_at``, and a cached copy may show slightly old
+counts until the post itself changes.
+
+The validators of a request are memoized on it since ``condition()`` asks for
+the ETag and Last-Modified separately.
+"""
+from datetime import datetime, timezone
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from newspaper import comment_queue
+from newspaper.home_cache import content_generation
+from newspaper.models import Post
+from newspaper.navigation_context_processor import navigation_version
+
+LIST_VERSION_KEY = "posts:list-version"
+
+published = Q(status="published", published_at__isnull=False)
+
+
+def _validators(request, key, build):
+    cache = request.__dict__.setdefault("_conditional_validators", {})
+    if key not in cache:
+        cache[key] = build()
+    return cache[key]
+
+
+def _etag(*parts):
+    return hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def post_state(request, pk):
+    """``(updated_at, comment count, last comment time)`` of a published post."""
+
+    def build():
+        if not str(pk).isdigit():
+            return None
+        return (
+            Post.objects.filter(published, pk=pk)
+            .values_list("updated_at", "comment_count")
+            .annotate(last_comment=Max("comment__created_at"))
+            .first()
+        )
+
+    return _validators(request, ("post", pk), build)
+
+
+def list_version():
+    """Time in ns of the latest change shown by the post lists."""
+    return cache.get_or_set(LIST_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_list_version():
+    cache.set(LIST_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def post_list_state(request):
+    return _validators(request, "posts", lambda: {"version": list_version()})
+
+
+def _page_parts(request):
+    # pages also render the navigation, the home sections generation and the
+    # login state in the header
+    return (navigation_version(), content_generation(), request.user.pk)
+
+
+def post_detail_etag(request, pk, **kwargs):
+    state = post_state(request, pk)
+    if state is None:
+        return None  # let the view answer 404
+    # the page also shows the reader's own comments still in the queue
+    pending = comment_queue.pending_ids(request)
+    return _etag(request.path, *state, *_page_parts(request), pending)
+
+
+def post_detail_last_modified(request, pk, **kwargs):
+    state = post_state(request, pk)
+    if state is None:
+        return None
+    return _latest(state[0], state[2])
+
+
+def post_list_etag(request, *args, **kwargs):
+    state = post_list_state(request)
+    return _etag(request.get_full_path(), *state.values(), *_page_parts(request))
+
+
+def post_list_last_modified(request, *args, **kwargs):
+    version = post_list_state(request)["version"]
+    return datetime.fromtimestamp(version / 1e9, timezone.utc)
+
+
+def api_post_detail_etag(request, pk, **kwargs):
+    state = post_state(request, pk)
+    if state is None:
+        return None
+    return _etag(request.path, request.headers.get("Accept", ""), *state)
+
+
+def api_post_list_etag(request, *args, **kwargs):
+    state = post_list_state(request)
+    return _etag(
+        request.get_full_path(), request.headers.get("Accept", ""), *state.values()
+    )
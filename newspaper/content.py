@@ -0,0 +1,86 @@
+"""
+Text derived from the Summernote HTML of ``Post.content``.
+
+``process_content()`` is run once when a post is saved and its results are
+stored on the post, so pages never sanitize or strip the HTML themselves.
+"""
+from html import unescape
+import math
+import re
+
+import bleach
+from bleach.html5lib_shim import Filter
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 177
+WORDS_PER_MINUTE = 200
+
+# what the Summernote toolbar produces; inline styles are dropped, bleach
+# needs tinycss2 to sanitize them
+ALLOWED_TAGS = set(
+    """
+    a b blockquote br code div em figcaption figure h1 h2 h3 h4 h5 h6 hr i
+    iframe img li ol p pre s span strike strong sub sup table tbody td th
+    thead tr u ul
+    """.split()
+)
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "target", "rel"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "iframe": ["src", "width", "height", "frameborder", "allowfullscreen"],
+    "td": ["colspan", "rowspan"],
+    "th": ["colspan", "rowspan"],
+}
+
+# strip_tags() glues "<p>a</p><p>b</p>" into "ab", so block ends become spaces
+BLOCK_END = re.compile(r"</(p|div|li|h[1-6]|blockquote|td|tr)>|<br\s*/?>", re.I)
+
+# code, not text: dropped with their content
+NON_TEXT = re.compile(r"<(script|style)\b.*?</\1\s*>", re.I | re.S)
+
+
+def html_to_text(html):
+    html = BLOCK_END.sub(" ", NON_TEXT.sub("", html))
+    return " ".join(unescape(strip_tags(html)).split())
+
+
+def make_excerpt(html, length=EXCERPT_LENGTH):
+    return Truncator(html_to_text(html)).chars(length)
+
+
+class LazyLoadFilter(Filter):
+    """Let the browser load images and embeds below the fold lazily."""
+
+    def __iter__(self):
+        for token in super().__iter__():
+            if token["type"] in ("StartTag", "EmptyTag") and token["name"] in (
+                "img",
+                "iframe",
+            ):
+                token["data"].setdefault((None, "loading"), "lazy")
+                if token["name"] == "img":
+                    token["data"].setdefault((None, "decoding"), "async")
+            yield token
+
+
+cleaner = bleach.Cleaner(
+    tags=ALLOWED_TAGS,
+    attributes=ALLOWED_ATTRIBUTES,
+    protocols={"http", "https", "mailto"},
+    strip=True,
+    filters=[LazyLoadFilter],
+)
+
+
+def process_content(html):
+    """Fields of ``Post`` derived from its content."""
+    text = html_to_text(html)
+    word_count = len(text.split())
+    return {
+        "content_html": cleaner.clean(NON_TEXT.sub("", html)),
+        "content_text": text,
+        "excerpt": Truncator(text).chars(EXCERPT_LENGTH),
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / WORDS_PER_MINUTE),
+    }
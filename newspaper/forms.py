@@ -36,10 +36,10 @@ class PostForm(forms.ModelForm):
         }
 
 
-class NewsLetterForm(forms.ModelForm):
-    class Meta:
-        model = NewsLetter
-        fields = "__all__"
+class NewsLetterForm(forms.Form):
+    # not a model form: subscribing again is not an error, see
+    # NewsLetter.objects.subscribe()
+    email = forms.EmailField(max_length=NewsLetter._meta.get_field("email").max_length)
 
 
 class ContactForm(forms.ModelForm):
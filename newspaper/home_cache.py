@@ -0,0 +1,74 @@
+"""
+Render cache of the home page sections.
+
+Every section fragment in ``aznews/main/main.html`` is cached under the
+current content generation, which is bumped whenever editors publish, update
+or delete a post. Bumping orphans all cached fragments at once; they expire
+on their own after their TTL (``settings.HOME_SECTION_CACHE_TTL``).
+
+Bumping renders the sections of the new generation again once the change is
+committed, so the first reader after a change does not wait for them. That
+fills the cache of the process making the change: with a cache local to each
+process, the other web processes still render them on their first request.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+
+from newspaper.home_feed import build_home_feed, build_whats_new
+from newspaper.navigation_context_processor import get_navigation, navigation_version
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "content:generation"
+WHATS_NEW_POSTS_PER_CATEGORY = 4
+
+
+def content_generation():
+    return cache.get_or_set(GENERATION_KEY, time.time_ns, timeout=None)
+
+
+def bump_content_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+    # rendered once the new content is visible to other connections
+    transaction.on_commit(warm_home_cache)
+
+
+def home_context():
+    """Context of the home page sections."""
+    # everything below is lazy so cached home sections skip the queries
+    feed = SimpleLazyObject(build_home_feed)
+    return {
+        "posts": SimpleLazyObject(lambda: feed.latest_posts),
+        "featured_post": SimpleLazyObject(lambda: feed.featured_post),
+        "most_viewed_posts": SimpleLazyObject(lambda: feed.most_viewed_posts),
+        "weekly_top_posts": SimpleLazyObject(lambda: feed.weekly_top_posts),
+        "whats_new": SimpleLazyObject(
+            lambda: build_whats_new(
+                get_navigation()["top_categories"], WHATS_NEW_POSTS_PER_CATEGORY
+            )
+        ),
+        "content_generation": content_generation(),
+        "navigation_version": navigation_version(),
+        "section_cache_ttl": settings.HOME_SECTION_CACHE_TTL,
+    }
+
+
+def warm_home_cache():
+    """
+    Render the home page sections to fill their cache, after every content
+    change and by the ``warm_home_cache`` command. A failure is only logged,
+    the first reader renders the sections then.
+    """
+    try:
+        render_to_string("aznews/main/main.html", home_context())
+    except Exception:
+        logger.exception("Cannot warm the home page sections")
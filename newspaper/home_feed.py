@@ -0,0 +1,132 @@
+"""
+Post lists of the home page widgets.
+
+All the ranked lists (featured, most viewed, weekly top, latest) are derived
+in Python from one bounded candidate query, and only the columns the widgets
+render are loaded, never the ``content`` TEXT column.
+"""
+from datetime import timedelta
+
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from newspaper.models import Post
+
+FEED_FIELDS = (
+    "id",
+    "title",
+    "featured_image",
+    "category__name",
+    "published_at",
+    "views_count",
+    "featured_image_sizes",
+)
+
+MOST_VIEWED_COUNT = 3
+WEEKLY_TOP_COUNT = 7
+LATEST_COUNT = 5
+
+
+class FeedPost:
+    """A post row holding just what the home page templates render."""
+
+    __slots__ = (
+        "id",
+        "title",
+        "featured_image",
+        "category_name",
+        "published_at",
+        "views_count",
+        "featured_image_sizes",
+    )
+
+    def __init__(
+        self,
+        id,
+        title,
+        featured_image,
+        category_name,
+        published_at,
+        views_count,
+        featured_image_sizes,
+    ):
+        self.id = id
+        self.title = title
+        self.featured_image = FieldFile(
+            None, Post._meta.get_field("featured_image"), featured_image
+        )
+        self.category_name = category_name
+        self.published_at = published_at
+        self.views_count = views_count
+        self.featured_image_sizes = featured_image_sizes
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.title
+
+
+class HomeFeed:
+    def __init__(self, rows, since):
+        by_views = sorted(rows, key=lambda post: (-post.views_count, -post.id))
+        self.most_viewed_posts = by_views[:MOST_VIEWED_COUNT]
+        self.featured_post = by_views[0] if by_views else None
+        self.weekly_top_posts = [
+            post for post in by_views if post.published_at >= since
+        ][:WEEKLY_TOP_COUNT]
+        self.latest_posts = sorted(
+            rows, key=lambda post: (post.published_at, post.id), reverse=True
+        )[:LATEST_COUNT]
+
+
+def published_posts():
+    return Post.objects.filter(status="published", published_at__isnull=False)
+
+
+def candidate_posts(since):
+    top_by_views = published_posts().order_by("-views_count", "-id")
+    latest = published_posts().order_by("-published_at", "-id")
+    weekly_top = top_by_views.filter(published_at__gte=since)
+    return published_posts().filter(
+        Q(pk__in=top_by_views.values("pk")[:MOST_VIEWED_COUNT])
+        | Q(pk__in=latest.values("pk")[:LATEST_COUNT])
+        | Q(pk__in=weekly_top.values("pk")[:WEEKLY_TOP_COUNT])
+    )
+
+
+def build_home_feed():
+    since = timezone.now() - timedelta(days=7)
+    rows = candidate_posts(since).values_list(*FEED_FIELDS)
+    rows = [FeedPost(*row) for row in rows]
+    return HomeFeed(rows, since)
+
+
+def build_whats_new(categories, per_category):
+    """
+    [(category, [latest posts]), ...] for the "Whats New" tabs, fetched in
+    one query however many categories there are.
+    """
+    latest_in_category = Subquery(
+        published_posts()
+        .filter(category=OuterRef("category"))
+        .order_by("-published_at", "-id")
+        .values("pk")[:per_category]
+    )
+    rows = (
+        published_posts()
+        .filter(
+            pk__in=latest_in_category,
+            category__in=[category.pk for category in categories],
+        )
+        .order_by("-published_at", "-id")
+        .values_list("category_id", *FEED_FIELDS)
+    )
+    posts_by_category = {}
+    for category_id, *row in rows:
+        posts_by_category.setdefault(category_id, []).append(FeedPost(*row))
+    return [
+        (category, posts_by_category.get(category.pk, [])) for category in categories
+    ]
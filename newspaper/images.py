@@ -0,0 +1,123 @@
+"""
+Resized derivatives of ``Post.featured_image``.
+
+Every named size in ``settings.POST_IMAGE_SIZES`` is stored next to the
+original upload, in the original format and as WebP:
+
+    post_images/2023/01/30/thumb.jpeg
+    post_images/2023/01/30/thumb.card.jpeg
+    post_images/2023/01/30/thumb.card.webp
+
+A full size WebP copy is stored as ``<name>.original.webp``. The widths
+actually available are recorded in ``Post.featured_image_sizes`` so templates
+can build ``srcset`` attributes without touching the storage.
+"""
+from io import BytesIO
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+ORIGINAL = "original"
+
+# Pillow format -> save options
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80, "method": 6},
+}
+
+
+def derivative_name(name, size, extension=None):
+    root, ext = posixpath.splitext(name)
+    return f"{root}.{size}.{extension or ext.lstrip('.')}"
+
+
+def generate_derivatives(name, storage=default_storage):
+    """
+    Write every configured size of the image ``name`` and return
+    ``{size: width}`` for the sizes generated, plus the width of the original.
+    Images are never upscaled, a size wider than the original is skipped.
+    """
+    with storage.open(name) as f:
+        image = Image.open(f)
+        image.load()
+    source_format = image.format if image.format in SAVE_OPTIONS else "JPEG"
+    image = ImageOps.exif_transpose(image)
+
+    generated = {}
+    for size, width in settings.POST_IMAGE_SIZES.items():
+        if width >= image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        _save(storage, resized, derivative_name(name, size), source_format)
+        _save(storage, resized, derivative_name(name, size, "webp"), "WEBP")
+        generated[size] = width
+
+    _save(storage, image, derivative_name(name, ORIGINAL, "webp"), "WEBP")
+    generated[ORIGINAL] = image.width
+    return generated
+
+
+def _save(storage, image, path, image_format):
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS[image_format])
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def srcset(name, sizes, webp=False):
+    """``srcset`` attribute value for the derivatives listed in ``sizes``."""
+    candidates = []
+    for size, width in sorted(sizes.items(), key=lambda item: item[1]):
+        if webp:
+            url = default_storage.url(derivative_name(name, size, "webp"))
+        elif size == ORIGINAL:
+            url = default_storage.url(name)
+        else:
+            url = default_storage.url(derivative_name(name, size))
+        candidates.append(f"{url} {width}w")
+    return ", ".join(candidates)
+
+
+def optimize_file(path, webp=False):
+    """
+    Re-encode the JPEG or PNG file at ``path`` without metadata (EXIF, text
+    chunks) and keep the result only if it is smaller. With ``webp`` a WebP
+    copy is also written as ``<name>.original.webp``. Returns the file size
+    before and after.
+    """
+    before = os.path.getsize(path)
+    with Image.open(path) as image:
+        image_format = image.format
+        if image_format not in ("JPEG", "PNG"):
+            return before, before
+        options = dict(SAVE_OPTIONS[image_format])
+        if image.info.get("icc_profile"):  # colors are wrong without it
+            options["icc_profile"] = image.info["icc_profile"]
+        image = ImageOps.exif_transpose(image)
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    after = before
+    if buffer.tell() < before:
+        # write next to the original and swap, a crash never leaves half a file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        after = buffer.tell()
+
+    if webp:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.mode in ("LA", "P", "PA") else "RGB")
+        webp_path = derivative_name(path, ORIGINAL, "webp")
+        image.save(webp_path, "WEBP", **SAVE_OPTIONS["WEBP"])
+    return before, after
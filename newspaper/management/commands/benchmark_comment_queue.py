@@ -0,0 +1,166 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from newspaper import comment_queue
+from newspaper.models import Comment, Post
+
+
+class Reader(threading.Thread):
+    """Reads the comment count of a post in a loop, timing every read."""
+
+    def __init__(self, post_id):
+        super().__init__(daemon=True)
+        self.post_id = post_id
+        self.stop = threading.Event()
+        self.latencies = []
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                Post.objects.filter(pk=self.post_id).values_list(
+                    "comment_count", flat=True
+                ).first()
+                self.latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    def slowest(self):
+        self.stop.set()
+        self.join()
+        return max(self.latencies, default=0) * 1000
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare writing comments in the request with queueing them "
+        "(newspaper/comment_queue.py): comments per second accepted and "
+        "written, with concurrent writers on one post, and the slowest "
+        "concurrent read of that post. The comments are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=2000)
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Concurrent writers."
+        )
+        parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--post", type=int, help="Post to comment on (default: the latest)."
+        )
+
+    def handle(self, *args, **options):
+        post = (
+            Post.objects.filter(pk=options["post"])
+            if options["post"]
+            else Post.objects.order_by("-id")
+        ).first()
+        if post is None:
+            raise CommandError("No post to comment on.")
+        self.post_id = post.pk
+        self.marker = f"benchmark-{uuid.uuid4().hex[:8]}"
+        count, threads = options["comments"], options["threads"]
+
+        try:
+            direct = self.direct(count, threads)
+            queued = self.queued(
+                count, threads, options["backend"], options["batch_size"]
+            )
+        finally:
+            # deleted one by one through the signals, which fix the count
+            Comment.objects.filter(name=self.marker).delete()
+
+        self.stdout.write(f"{count} comments on post {post.pk}, {threads} writers")
+        self.report("direct writes", count, *direct)
+        self.report(f"{options['backend']} queue", count, *queued)
+
+    def report(self, label, count, accepted, written, errors, slowest_read):
+        self.stdout.write(
+            f"  {label:<14} accepted {count / accepted:8.0f}/s  "
+            f"written {count / written:8.0f}/s  errors {errors:5}  "
+            f"slowest read {slowest_read:7.1f} ms"
+        )
+
+    def payload(self, i):
+        return {
+            "post_id": self.post_id,
+            "name": self.marker,
+            "email": "benchmark@example.com",
+            "message": f"comment {i}",
+        }
+
+    def shares(self, count, threads):
+        return [range(i, count, threads) for i in range(threads)]
+
+    def direct(self, count, threads):
+        shares = self.shares(count, threads)
+        failed = []
+
+        def write(thread):
+            try:
+                for i in shares[thread]:
+                    try:
+                        Comment(**self.payload(i)).save()
+                    except OperationalError:  # database is locked
+                        failed.append(i)
+            finally:
+                connection.close()
+
+        reader = Reader(self.post_id)
+        reader.start()
+        start = time.perf_counter()
+        run_threads(write, threads)
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed, len(failed), reader.slowest()
+
+    def queued(self, count, threads, backend, batch_size):
+        with tempfile.TemporaryDirectory() as directory:
+            if backend == "sqlite":
+                queue = comment_queue.SQLiteQueue(os.path.join(directory, "q.db"))
+            else:
+                queue = comment_queue.MemoryQueue()
+            shares = self.shares(count, threads)
+            producing = threading.Event()
+            producing.set()
+            failed = []
+
+            def consume():
+                try:
+                    while producing.is_set() or len(queue):
+                        try:
+                            if not comment_queue.drain(batch_size, queue=queue):
+                                time.sleep(0.001)
+                        except OperationalError:
+                            failed.append(batch_size)
+                finally:
+                    connection.close()
+
+            reader = Reader(self.post_id)
+            reader.start()
+            consumer = threading.Thread(target=consume)
+            start = time.perf_counter()
+            consumer.start()
+            run_threads(
+                lambda thread: [queue.put(self.payload(i)) for i in shares[thread]],
+                threads,
+            )
+            accepted = time.perf_counter() - start
+            producing.clear()
+            consumer.join()
+            written = time.perf_counter() - start
+            return accepted, written, len(failed), reader.slowest()
@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from newspaper import exports
+from newspaper.models import NewsLetter
+
+BATCH_SIZE = 5000
+
+
+def measure(function):
+    """``(peak traced memory in MB, seconds)`` of calling ``function``."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        function()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Show that the newsletter export runs in constant memory: export at "
+        "growing row counts and report the peak memory, against loading the "
+        "same rows in a list. The subscribers are added in a transaction "
+        "that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument(
+            "--no-buffered",
+            action="store_true",
+            help="Skip loading the rows in a list for comparison.",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        sizes = sorted({max(rows // 100, 1), max(rows // 10, 1), rows})
+        _, header = exports.EXPORTS["newsletter"]
+        prefix = uuid.uuid4().hex[:8]
+
+        self.stdout.write(
+            f"{'rows':>10} {'export MB':>10} {'export s':>9} "
+            f"{'list MB':>9} {'list s':>7}"
+        )
+        with transaction.atomic():
+            inserted = NewsLetter.objects.count()
+            for size in sizes:
+                while inserted < size:
+                    count = min(BATCH_SIZE, size - inserted)
+                    NewsLetter.objects.bulk_create(
+                        NewsLetter(email=f"{prefix}-{inserted + i}@example.com")
+                        for i in range(count)
+                    )
+                    inserted += count
+
+                def export():
+                    rows = exports.export_rows("newsletter")
+                    for line in exports.lines(options["format"], header, rows):
+                        pass
+
+                def buffered():
+                    list(NewsLetter.objects.values_list(*header))
+
+                export_mb, export_s = measure(export)
+                line = f"{size:>10} {export_mb:>10.1f} {export_s:>9.1f}"
+                if not options["no_buffered"]:
+                    list_mb, list_s = measure(buffered)
+                    line += f" {list_mb:>9.1f} {list_s:>7.1f}"
+                self.stdout.write(line)
+            transaction.set_rollback(True)
@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.views import published_and_active
+from newspaper.home_feed import candidate_posts
+from newspaper.models import Comment, Post, Tag
+from newspaper.navigation_context_processor import top_categories_by_views
+
+# EXPLAIN output that means a table is read or sorted without an index
+FULL_SCAN_MARKERS = {
+    "sqlite": ("SCAN newspaper_post", "SCAN newspaper_comment", "USE TEMP B-TREE"),
+    "postgresql": ("Seq Scan",),
+    "mysql": ("type: ALL",),
+}
+
+# plan lines known and accepted, per query: the top categories are sorted by
+# their summed post views, which no index can order; there are few categories
+# and the result is cached (settings.NAVIGATION_CACHE_TIMEOUT)
+KNOWN_SCANS = {
+    "navigation top categories": ("USE TEMP B-TREE FOR ORDER BY",),
+}
+
+
+def hot_querysets(post=None, tag_id=None):
+    """
+    The queries behind newspaper.views and api.views, keyed by name. The
+    queries of a post are None without ``post``, that of a tag without
+    ``tag_id``.
+    """
+    published = Post.objects.filter(status="published", published_at__isnull=False)
+    latest = published.order_by("-published_at", "-id")
+    queries = {
+        "home feed candidates": candidate_posts(timezone.now() - timedelta(days=7)),
+        "post list page": latest[:11],
+        "post list by category": None,
+        "post list by tag": None,
+        "post detail previous and next post": None,
+        "most viewed posts": published.order_by("-views_count")[:3],
+        "latest comments": None,
+        "api posts list": Post.objects.filter(published_and_active).order_by(
+            "-published_at", "-id"
+        )[:11],
+        "navigation top categories": top_categories_by_views(),
+    }
+    if post is not None:
+        queries["post list by category"] = latest.filter(category=post.category_id)[:11]
+        queries["post detail previous and next post"] = Post.objects.adjacent_to(post)
+        queries["latest comments"] = Comment.objects.filter(post=post.pk).order_by(
+            "-created_at"
+        )[:10]
+    if tag_id is not None:
+        queries["post list by tag"] = latest.filter(tag=tag_id)[:11]
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the hot post and comment queries and report whether "
+        "each of them is served by an index. The scans listed in KNOWN_SCANS "
+        "are accepted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Exit with an error if any query reads a table without an index.",
+        )
+        parser.add_argument(
+            "--post",
+            type=int,
+            help="Published post the per-post queries are explained with "
+            "(default: the latest).",
+        )
+        parser.add_argument(
+            "--tag",
+            type=int,
+            help="Tag the tag list is explained with (default: one of the post's).",
+        )
+        parser.add_argument(
+            "--verbose-plan",
+            action="store_true",
+            help="Print the full query plan of every query.",
+        )
+
+    def sample_post(self, pk):
+        published = Post.objects.filter(status="published", published_at__isnull=False)
+        if pk is None:
+            return published.order_by("-published_at", "-id").first()
+        post = published.filter(pk=pk).first()
+        if post is None:
+            raise CommandError(f"No published post {pk}.")
+        return post
+
+    def sample_tag(self, pk, post):
+        tags = Tag.objects.order_by("pk").values_list("pk", flat=True)
+        if pk is not None:
+            if not tags.filter(pk=pk).exists():
+                raise CommandError(f"No tag {pk}.")
+            return pk
+        # a tag of the sample post, or any tag
+        return (post and tags.filter(post=post).first()) or tags.first()
+
+    def handle(self, *args, **options):
+        markers = FULL_SCAN_MARKERS.get(connection.vendor, ())
+        post = self.sample_post(options["post"])
+        tag_id = self.sample_tag(options["tag"], post)
+        scans = []
+        for name, queryset in hot_querysets(post, tag_id).items():
+            if queryset is None:
+                missing = "tag" if name == "post list by tag" else "published post"
+                self.stdout.write(f"SKIPPED   {name} (no {missing} to explain with)")
+                continue
+            plan = queryset.explain()
+            full_scan = [
+                line
+                for line in plan.splitlines()
+                if any(marker in line for marker in markers)
+                and not any(known in line for known in KNOWN_SCANS.get(name, ()))
+            ]
+            if full_scan:
+                scans.append(name)
+                self.stdout.write(self.style.WARNING(f"NO INDEX  {name}"))
+                for line in full_scan:
+                    self.stdout.write(f"          {line.strip()}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"INDEXED   {name}"))
+            if options["verbose_plan"]:
+                self.stdout.write(plan)
+
+        if scans and options["strict"]:
+            raise CommandError(f"{len(scans)} queries are not served by an index.")
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the newsletter subscribers or the contact messages as CSV or "
+        "NDJSON, streamed from the database in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(exports.EXPORTS))
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument(
+            "--since", help="Only records created from this date or datetime on."
+        )
+        parser.add_argument(
+            "--until", help="Only records created before this date or datetime."
+        )
+        parser.add_argument(
+            "--output", help="File to write to (default: standard output)."
+        )
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for bound in ("since", "until"):
+            if options[bound]:
+                try:
+                    bounds[bound] = exports.parse_moment(options[bound])
+                except ValueError as error:
+                    raise CommandError(error)
+        _, header = exports.EXPORTS[options["name"]]
+        rows = exports.export_rows(
+            options["name"], chunk_size=options["chunk_size"], **bounds
+        )
+        lines = exports.lines(options["format"], header, rows)
+
+        out = (
+            open(options["output"], "w", newline="")
+            if options["output"]
+            else sys.stdout
+        )
+        try:
+            out.writelines(lines)
+        finally:
+            if out is not sys.stdout:
+                out.close()
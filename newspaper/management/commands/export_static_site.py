@@ -0,0 +1,291 @@
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+from importlib import import_module
+import json
+import os
+import shutil
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Max
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from newspaper.models import Category, Comment, Post, RelatedPost, Tag
+from newspaper.navigation_context_processor import build_navigation
+from newspaper.pagination import encode_cursor
+from newspaper.views import PostListView
+
+MANIFEST_NAME = ".export.json"
+
+ListedPost = namedtuple("ListedPost", "pk published_at updated_at")
+
+
+def fingerprint(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def page_file(path, cursor=None):
+    directory = path.strip("/")
+    name = f"cursor-{cursor}.html" if cursor else "index.html"
+    return os.path.join(directory, name) if directory else name
+
+
+def render_page(url, files, output):
+    """Render ``url`` as an anonymous reader and write it to ``files``."""
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    # what the middlewares give a reader without cookies
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    match = resolve(request.path_info)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception as error:
+        return url, error
+    if response.status_code != 200:
+        return url, f"HTTP {response.status_code}"
+    for name in files:
+        path = os.path.join(output, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(f"{path}.tmp", path)
+    return url, None
+
+
+def copy_if_changed(source, destination):
+    try:
+        stat = os.stat(destination)
+    except FileNotFoundError:
+        pass
+    else:
+        source_stat = os.stat(source)
+        if (
+            stat.st_size == source_stat.st_size
+            and stat.st_mtime >= source_stat.st_mtime
+        ):
+            return False
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.copy2(source, destination)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the public site (home, published posts, post list, category "
+        "and tag pages) to static HTML files, with the static and media "
+        "files, for a web server to serve without Django. Only the pages "
+        "whose data changed since the last export are rendered again. "
+        "List pages after the first are written as <path>/cursor-<cursor>.html, "
+        "with nginx: try_files $uri/cursor-$arg_cursor.html $uri/index.html =404;"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory to write the site to.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Render every page, changed or not.",
+        )
+        parser.add_argument(
+            "--skip-assets",
+            action="store_true",
+            help="Do not copy the static and media files.",
+        )
+
+    def load_manifest(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_manifest(self, path, manifest):
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
+
+    def site_pages(self):
+        """Yield ``(url, fingerprint, files)`` for every page of the site."""
+        navigation = build_navigation()
+        # header and sidebars of every page
+        layout = (
+            [(c.pk, c.name, c.post_count) for c in navigation["categories"]],
+            [(c.pk, c.name) for c in navigation["top_categories"]],
+            [(t.pk, t.name) for t in navigation["tags"]],
+        )
+
+        published = Post.objects.filter(status="published", published_at__isnull=False)
+        posts = list(
+            published.order_by("-published_at", "-id").values_list(
+                "id",
+                "title",
+                "category_id",
+                "published_at",
+                "updated_at",
+                "views_count",
+            )
+        )
+        tags_of_post = defaultdict(list)
+        posts_of_tag = defaultdict(set)
+        for tag_id, post_id in Post.tag.through.objects.filter(
+            post__in=published
+        ).values_list("tag_id", "post_id"):
+            tags_of_post[post_id].append(tag_id)
+            posts_of_tag[tag_id].add(post_id)
+        comments = {
+            post_id: (count, last)
+            for post_id, count, last in Comment.objects.values("post")
+            .annotate(count=Count("id"), last=Max("created_at"))
+            .values_list("post", "count", "last")
+        }
+        related = defaultdict(list)
+        for post_id, related_id, title, updated_at in RelatedPost.objects.order_by(
+            "post", "-score", "-related"
+        ).values_list("post", "related", "related__title", "related__updated_at"):
+            related[post_id].append((related_id, title, updated_at))
+
+        yield reverse("home"), fingerprint(layout, posts), [page_file("/")]
+
+        recent = [
+            (pk, title, updated_at) for pk, title, _, _, updated_at, _ in posts[:4]
+        ]
+        # posts is in publication order, the neighbours of the detail pages
+        for index, (pk, title, category_id, _, updated_at, _) in enumerate(posts):
+            neighbours = [
+                posts[i][:2] + posts[i][4:5]
+                for i in (index - 1, index + 1)
+                if 0 <= i < len(posts)
+            ]
+            url = reverse("post-detail", args=[pk])
+            state = (
+                pk,
+                title,
+                category_id,
+                updated_at,
+                sorted(tags_of_post[pk]),
+                comments.get(pk),
+                neighbours,
+                related[pk],
+                recent,
+            )
+            yield url, fingerprint(layout, state), [page_file(url)]
+
+        listed = [
+            ListedPost(pk, published_at, updated_at)
+            for pk, _, _, published_at, updated_at, _ in posts
+        ]
+        yield from self.list_pages(reverse("post-list"), listed, layout)
+        for category in Category.objects.all():
+            category_posts = [
+                post for post, row in zip(listed, posts) if row[2] == category.pk
+            ]
+            url = reverse("post-by-category", args=[category.pk])
+            yield from self.list_pages(url, category_posts, layout)
+        for tag in Tag.objects.all():
+            tag_posts = [post for post in listed if post.pk in posts_of_tag[tag.pk]]
+            url = reverse("post-by-tag", args=[tag.pk])
+            yield from self.list_pages(url, tag_posts, layout)
+
+    def list_pages(self, path, posts, layout):
+        """Pages of a keyset paginated list, see newspaper.pagination."""
+        size = PostListView.paginate_by
+        pages = [posts[start : start + size] for start in range(0, len(posts), size)]
+        for number, page in enumerate(pages or [[]]):
+            # a page is reached by the next link of the page before it and by
+            # the previous link of the page after it, both render the same
+            cursor = encode_cursor(pages[number - 1][-1], False) if number else None
+            files = [page_file(path, cursor)]
+            if number + 1 < len(pages):
+                files.append(page_file(path, encode_cursor(pages[number + 1][0], True)))
+            url = f"{path}?cursor={cursor}" if cursor else path
+            state = [(post.pk, post.updated_at) for post in page]
+            yield url, fingerprint(layout, state, number + 1 < len(pages)), files
+
+    def copy_assets(self, output):
+        copied = 0
+        for finder in finders.get_finders():
+            for path, storage in finder.list(["CVS", ".*", "*~"]):
+                prefix = getattr(storage, "prefix", None) or ""
+                destination = os.path.join(output, "static", prefix, path)
+                copied += copy_if_changed(storage.path(path), destination)
+        for root, dirs, files in os.walk(settings.MEDIA_ROOT):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                source = os.path.join(root, name)
+                relative = os.path.relpath(source, settings.MEDIA_ROOT)
+                copied += copy_if_changed(
+                    source, os.path.join(output, "media", relative)
+                )
+        return copied
+
+    def handle(self, *args, **options):
+        output = os.path.abspath(options["output"])
+        os.makedirs(output, exist_ok=True)
+        manifest_path = os.path.join(output, MANIFEST_NAME)
+        manifest = {} if options["full"] else self.load_manifest(manifest_path)
+
+        pages = list(self.site_pages())
+        current = {name for _, _, files in pages for name in files}
+        changed = [
+            (url, digest, files)
+            for url, digest, files in pages
+            if any(manifest.get(name) != digest for name in files)
+            or not all(os.path.exists(os.path.join(output, name)) for name in files)
+        ]
+        self.stdout.write(f"{len(changed)} of {len(pages)} pages to render.")
+
+        # forked workers must not share the parent's database connections
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as pool:
+            futures = {
+                pool.submit(render_page, url, files, output): (digest, files)
+                for url, digest, files in changed
+            }
+            for future in as_completed(futures):
+                url, error = future.result()
+                digest, files = futures[future]
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{url}: {error}")
+                    continue
+                for name in files:
+                    manifest[name] = digest
+
+        # posts unpublished or deleted since the last export
+        removed = 0
+        for name in set(manifest) - current:
+            try:
+                os.remove(os.path.join(output, name))
+            except FileNotFoundError:
+                pass
+            del manifest[name]
+            removed += 1
+        self.save_manifest(manifest_path, manifest)
+
+        copied = 0 if options["skip_assets"] else self.copy_assets(output)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {len(changed) - failed} pages ({failed} failed), "
+                f"removed {removed}, copied {copied} static and media files "
+                f"to {output}."
+            )
+        )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import view_counter
+
+
+class Command(BaseCommand):
+    help = "Write the buffered post view counts to the database now."
+
+    def handle(self, *args, **options):
+        if not view_counter.is_shared():
+            raise CommandError(
+                f"The {settings.VIEW_COUNT_CACHE!r} cache is local to each "
+                "process, this command cannot see the views buffered by the web "
+                "processes; they flush them on their own requests. Point "
+                "VIEW_COUNT_CACHE to a shared cache (memcached, redis) to use it."
+            )
+        written = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {written} buffered views."))
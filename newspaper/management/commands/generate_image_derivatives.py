@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from newspaper import images
+from newspaper.models import Post
+
+
+def resize(name):
+    try:
+        return name, images.generate_derivatives(name), None
+    except OSError as error:
+        return name, None, error
+
+
+class Command(BaseCommand):
+    help = "Generate the resized copies of existing Post featured images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate images that already have derivatives.",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(featured_image="")
+        if not options["all"]:
+            posts = posts.filter(featured_image_sizes={})
+        post_ids = {}  # {image name: [post id, ...]}
+        for pk, name in posts.values_list("pk", "featured_image").iterator():
+            post_ids.setdefault(name, []).append(pk)
+
+        # forked workers must not share the parent's database connection
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as pool:
+            futures = [pool.submit(resize, name) for name in post_ids]
+            for future in as_completed(futures):
+                name, sizes, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                    continue
+                Post.objects.filter(pk__in=post_ids[name]).update(
+                    featured_image_sizes=sizes
+                )
+                done += 1
+                self.stdout.write(f"[{done + failed}/{len(post_ids)}] {name}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Resized {done} images, {failed} failed.")
+        )
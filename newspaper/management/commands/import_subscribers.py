@@ -0,0 +1,71 @@
+import csv
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+from newspaper.models import NewsLetter, normalize_email
+
+
+class Command(BaseCommand):
+    help = (
+        "Subscribe the addresses of a CSV file to the newsletter, in batches. "
+        "Addresses already subscribed, repeated or invalid are skipped, so an "
+        "interrupted import can be run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, with a header row.")
+        parser.add_argument(
+            "--column", default="email", help="Column of the addresses."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            file = open(options["path"], newline="", encoding="utf-8-sig")
+        except OSError as error:
+            raise CommandError(error)
+        with file:
+            reader = csv.DictReader(file)
+            if options["column"] not in (reader.fieldnames or []):
+                raise CommandError(f"No {options['column']!r} column.")
+            self.import_rows(reader, options["column"], options["batch_size"])
+
+    def import_rows(self, reader, column, batch_size):
+        before = NewsLetter.objects.count()
+        start = time.perf_counter()
+        read = invalid = 0
+        batch = set()
+        for row in reader:
+            read += 1
+            email = normalize_email(row[column] or "")
+            try:
+                validate_email(email)
+            except ValidationError:
+                invalid += 1
+                continue
+            batch.add(email)
+            if len(batch) == batch_size:
+                self.insert(batch)
+                batch = set()
+                self.stdout.write(
+                    f"{read} rows read, {read / (time.perf_counter() - start):.0f}/s"
+                )
+        self.insert(batch)
+
+        imported = NewsLetter.objects.count() - before
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Subscribed {imported} addresses from {read} rows "
+                f"({invalid} invalid, {read - invalid - imported} already "
+                f"subscribed or repeated) in {time.perf_counter() - start:.1f}s."
+            )
+        )
+
+    def insert(self, emails):
+        # the unique constraint skips the addresses already subscribed
+        NewsLetter.objects.bulk_create(
+            [NewsLetter(email=email) for email in emails], ignore_conflicts=True
+        )
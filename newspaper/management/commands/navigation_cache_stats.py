@@ -0,0 +1,31 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import shared_cache
+from newspaper.navigation_context_processor import navigation_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the hit/miss counters of the cached navigation data. Needs a "
+        "shared cache; with a local one every web process logs its own "
+        "counters on each navigation cache miss."
+    )
+
+    def handle(self, *args, **options):
+        if not shared_cache.is_shared(caches["default"]):
+            raise CommandError(
+                "The default cache is local to each process, this command would "
+                "only see its own counters. The web processes log theirs on every "
+                "navigation cache miss (logger "
+                "newspaper.navigation_context_processor)."
+            )
+        stats = navigation_cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups if lookups else 0
+        self.stdout.write(
+            f"version: {stats['version']}\n"
+            f"hits: {stats['hits']}\n"
+            f"misses: {stats['misses']}\n"
+            f"hit ratio: {ratio:.1%}"
+        )
@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
+import os
+import re
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from newspaper import images
+from newspaper.models import Post
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# resized copies written by newspaper.images are optimized already
+DERIVATIVE = re.compile(
+    r"\.(%s)\.\w+$" % "|".join([images.ORIGINAL, *settings.POST_IMAGE_SIZES])
+)
+MANIFEST_SAVE_EVERY = 50
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_state(path, digest=None):
+    """``[size, mtime, hash]`` of ``path`` as recorded in the manifest."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns, digest or file_hash(path)]
+
+
+def optimize(path, name, webp, featured):
+    """
+    Optimize ``path`` (``name`` in the storage); the resized copies of a
+    featured image are generated again when it was re-encoded.
+    """
+    try:
+        before, after = images.optimize_file(path, webp=webp)
+        sizes = None
+        if featured and after < before:
+            sizes = images.generate_derivatives(name)
+    except OSError as error:
+        return path, None, None, None, None, error
+    return path, before, after, file_state(path), sizes, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encode uploaded post and Summernote images (progressive JPEG, "
+        "optimized PNG, no metadata). Files already processed and unchanged "
+        "since (same size and modification time, or same content) are "
+        "skipped, so an interrupted run can be resumed. The resized copies of "
+        "re-encoded featured images are generated again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directories",
+            nargs="*",
+            default=["post_images", "django-summernote"],
+            help="Directories under MEDIA_ROOT to process.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--webp",
+            action="store_true",
+            help="Also write a WebP copy of every image.",
+        )
+        parser.add_argument(
+            "--manifest",
+            default=os.path.join(settings.MEDIA_ROOT, ".optimize_media.json"),
+            help="JSON file recording the processed files, their size, "
+            "modification time and hash.",
+        )
+
+    def load_manifest(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_manifest(self, path, manifest):
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
+
+    def find_images(self, directories, manifest):
+        for directory in directories:
+            top = os.path.join(settings.MEDIA_ROOT, directory)
+            for root, dirs, files in os.walk(top):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if not name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if DERIVATIVE.search(name):
+                        continue
+                    key = os.path.relpath(path, settings.MEDIA_ROOT)
+                    if self.unchanged(path, manifest, key):
+                        continue
+                    yield path
+
+    def unchanged(self, path, manifest, key):
+        recorded = manifest.get(key)
+        if recorded is None:
+            return False
+        if isinstance(recorded, str):  # a bare hash, from earlier versions
+            recorded = [None, None, recorded]
+        stat = os.stat(path)
+        if recorded[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return True
+        # touched (copied, restored) but maybe not changed
+        digest = file_hash(path)
+        if digest != recorded[2]:
+            return False
+        manifest[key] = file_state(path, digest)
+        return True
+
+    def handle(self, *args, **options):
+        manifest_path = options["manifest"]
+        manifest = self.load_manifest(manifest_path)
+        paths = list(self.find_images(options["directories"], manifest))
+        self.stdout.write(f"{len(paths)} images to optimize.")
+        names = {
+            path: os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+            for path in paths
+        }
+        featured = set(
+            Post.objects.filter(featured_image__in=names.values()).values_list(
+                "featured_image", flat=True
+            )
+        )
+
+        # forked workers must not share the parent's database connection
+        connections.close_all()
+        started = time.monotonic()
+        done = failed = bytes_before = bytes_after = resized = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as pool:
+            futures = [
+                pool.submit(optimize, path, name, options["webp"], name in featured)
+                for path, name in names.items()
+            ]
+            for future in as_completed(futures):
+                path, before, after, state, sizes, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{path}: {error}")
+                    continue
+                done += 1
+                bytes_before += before
+                bytes_after += after
+                if sizes is not None:
+                    resized += Post.objects.filter(featured_image=names[path]).update(
+                        featured_image_sizes=sizes
+                    )
+                manifest[os.path.relpath(path, settings.MEDIA_ROOT)] = state
+                if done % MANIFEST_SAVE_EVERY == 0:
+                    self.save_manifest(manifest_path, manifest)
+        self.save_manifest(manifest_path, manifest)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        saved = bytes_before - bytes_after
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Optimized {done} images ({failed} failed) in {elapsed:.1f}s: "
+                f"{bytes_before / 1e6:.2f} MB -> {bytes_after / 1e6:.2f} MB, "
+                f"saved {saved / 1e6:.2f} MB "
+                f"({saved / bytes_before if bytes_before else 0:.1%}), "
+                f"{done / elapsed:.1f} images/s, "
+                f"{bytes_before / 1e6 / elapsed:.2f} MB/s. Resized the featured "
+                f"image of {resized} posts again."
+            )
+        )
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import comment_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the queued comments to the database in batches "
+        "(newspaper/comment_queue.py), until interrupted or, with --once, "
+        "until the queue is empty."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Write what is queued now and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.COMMENT_QUEUE_BATCH_SIZE,
+            help="Comments written per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.COMMENT_QUEUE_INTERVAL,
+            help="Seconds to wait when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        if comment_queue.get_queue() is None:
+            raise CommandError("COMMENT_QUEUE_BACKEND is not set.")
+        if options["once"]:
+            total = 0
+            while taken := comment_queue.drain(options["batch_size"]):
+                total += taken
+            self.stdout.write(self.style.SUCCESS(f"Processed {total} comments."))
+            return
+
+        self.stdout.write("Writing queued comments, press CTRL-C to stop.")
+        try:
+            comment_queue.run_worker(
+                interval=options["interval"],
+                batch_size=options["batch_size"],
+            )
+        except KeyboardInterrupt:
+            pass
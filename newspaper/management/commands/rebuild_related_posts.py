@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from newspaper import related
+
+
+class Command(BaseCommand):
+    help = "Recompute the related posts of every published post."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows inserted per query (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        posts = related.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Related posts of {posts} posts computed in "
+                f"{time.monotonic() - started:.1f}s."
+            )
+        )
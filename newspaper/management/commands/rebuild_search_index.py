@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from newspaper import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of published posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of posts indexed per batch (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        indexed = backend.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {indexed} posts with {backend.__class__.__name__}."
+            )
+        )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from newspaper import conditional, page_cache
+from newspaper.models import Comment, Post
+
+
+def actual_count():
+    return Coalesce(
+        Subquery(
+            Comment.objects.filter(post=OuterRef("pk"))
+            .values("post")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the denormalized Post.comment_count with the comments of "
+        "every post and repair the counts that drifted, e.g. after comments "
+        "were written with raw SQL or bulk operations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked per query (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the posts whose count is wrong.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = repaired = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .annotate(actual=actual_count())
+                .values_list("pk", "comment_count", "actual")[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            checked += len(rows)
+            wrong = [pk for pk, stored, actual in rows if stored != actual]
+            for pk, stored, actual in rows:
+                if stored != actual:
+                    self.stdout.write(f"  post {pk}: {stored} -> {actual}")
+            if wrong and not options["dry_run"]:
+                # counted again in the update, comments may come and go meanwhile
+                Post.objects.filter(pk__in=wrong).update(comment_count=actual_count())
+                page_cache.purge(f"post:{pk}" for pk in wrong)
+                conditional.bump_list_version()
+            repaired += len(wrong)
+
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {repaired} wrong counts in {checked} posts.")
+        )
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from newspaper.content import process_content
+from newspaper.models import Post
+
+FIELDS = [
+    "content_html",
+    "content_text",
+    "excerpt",
+    "word_count",
+    "reading_time",
+    "updated_at",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the sanitized HTML, plain text, excerpt, word count and "
+        "reading time of posts again from their content, e.g. after a change "
+        "to newspaper.content."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of posts updated per query (default: 500).",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only posts never rendered (empty rendered HTML).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.only("id", "content").order_by("id")
+        if options["missing"]:
+            posts = posts.filter(content_html="")
+
+        batch = []
+        rendered = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            for field, value in process_content(post.content).items():
+                setattr(post, field, value)
+            # the pages showing the post change, let caches and exports know
+            post.updated_at = timezone.now()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                rendered += self.save(batch)
+                batch = []
+        rendered += self.save(batch)
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} posts."))
+
+    def save(self, posts):
+        Post.objects.bulk_update(posts, FIELDS)
+        if posts:
+            self.stdout.write(f"  ... up to post {posts[-1].pk}")
+        return len(posts)
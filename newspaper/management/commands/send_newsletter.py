@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import exports, newsletter
+from newspaper.models import NewsletterIssue
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the newsletter digest of the posts published since the last "
+        "issue to every subscriber (newspaper/newsletter.py). An issue left "
+        "unfinished by an earlier run is resumed instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--issue",
+            type=int,
+            help="Resume this issue (default: the latest unfinished).",
+        )
+        parser.add_argument(
+            "--since",
+            help="Digest the posts published after this date or datetime "
+            "(default: the end of the previous issue).",
+        )
+        parser.add_argument("--subject", help="Subject of a new issue.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.NEWSLETTER_BATCH_SIZE,
+            help="Messages sent per connection.",
+        )
+        parser.add_argument("--threads", type=int, default=settings.NEWSLETTER_THREADS)
+
+    def handle(self, *args, **options):
+        if options["issue"]:
+            issue = NewsletterIssue.objects.filter(pk=options["issue"]).first()
+            if issue is None:
+                raise CommandError(f"No issue {options['issue']}.")
+        else:
+            issue = (
+                NewsletterIssue.objects.filter(sent_at__isnull=True)
+                .order_by("-id")
+                .first()
+            )
+        if issue is None:
+            since = None
+            if options["since"]:
+                try:
+                    since = exports.parse_moment(options["since"])
+                except ValueError as error:
+                    raise CommandError(error)
+            issue = newsletter.create_issue(since=since, subject=options["subject"])
+            if issue is None:
+                self.stdout.write("No posts published since the last issue.")
+                return
+            self.stdout.write(
+                f"Created issue {issue.pk} of {issue.posts.count()} posts "
+                f"for {issue.deliveries.count()} subscribers."
+            )
+        else:
+            self.stdout.write(f"Resuming issue {issue.pk}.")
+
+        start = time.perf_counter()
+        sent, failed = newsletter.send(
+            issue, batch_size=options["batch_size"], threads=options["threads"]
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {sent} messages, {failed} failed, in {elapsed:.1f}s "
+                f"({sent / elapsed if elapsed else 0:.0f}/s)."
+            )
+        )
+        left = newsletter.unsent(issue).count()
+        if left:
+            self.stdout.write(f"{left} deliveries left, run again to retry them.")
@@ -0,0 +1,27 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from newspaper import shared_cache
+from newspaper.home_cache import content_generation, warm_home_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the home page sections into the shared cache, on a schedule "
+        "so no reader waits for them once they expire. Content changes warm "
+        "them on their own."
+    )
+
+    def handle(self, *args, **options):
+        if not shared_cache.is_shared(caches["default"]):
+            raise CommandError(
+                "The default cache is local to each process, this command would "
+                "only warm its own. Point CACHES to a shared cache (memcached, "
+                "redis) to use it."
+            )
+        warm_home_cache()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warmed home page sections for generation {content_generation()}."
+            )
+        )
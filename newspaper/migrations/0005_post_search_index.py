@@ -0,0 +1,59 @@
+from html import unescape
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS newspaper_post_search "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        insert = (
+            "INSERT INTO newspaper_post_search (rowid, title, body) VALUES (%s, %s, %s)"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS newspaper_post_search ("
+            "post_id bigint PRIMARY KEY REFERENCES newspaper_post (id) ON DELETE CASCADE, "
+            "title text NOT NULL, body text NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS newspaper_post_search_document "
+            "ON newspaper_post_search USING GIN (document)"
+        )
+        insert = (
+            "INSERT INTO newspaper_post_search (post_id, title, body, document) "
+            "VALUES (%s, %s, %s, setweight(to_tsvector('english', %s), 'A') || "
+            "setweight(to_tsvector('english', %s), 'B'))"
+        )
+    else:
+        return
+
+    Post = apps.get_model("newspaper", "Post")
+    posts = Post.objects.filter(status="published", published_at__isnull=False)
+    with schema_editor.connection.cursor() as cursor:
+        for post in posts.only("id", "title", "content").iterator():
+            body = " ".join(unescape(strip_tags(post.content)).split())
+            params = [post.pk, post.title, body]
+            if vendor == "postgresql":
+                params += [post.title, body]
+            cursor.execute(insert, params)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS newspaper_post_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0004_comment"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:24
+
+from html import unescape
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# frozen copy of newspaper.content.make_excerpt() as of this migration
+BLOCK_END = re.compile(r"</(p|div|li|h[1-6]|blockquote|td|tr)>|<br\s*/?>", re.I)
+
+
+def make_excerpt(html, length=177):
+    text = " ".join(unescape(strip_tags(BLOCK_END.sub(" ", html))).split())
+    return Truncator(text).chars(length)
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model("newspaper", "Post")
+    posts = Post.objects.only("id", "content")
+    batch = []
+    for post in posts.iterator(chunk_size=500):
+        post.excerpt = make_excerpt(post.content)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ["excerpt"])
+            batch = []
+    Post.objects.bulk_update(batch, ["excerpt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0005_post_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
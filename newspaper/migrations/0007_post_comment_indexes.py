@@ -0,0 +1,38 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0006_post_excerpt"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at"], name="newspaper_c_post_id_746587_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["status", "published_at"], name="newspaper_p_status_62c7d1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["status", "views_count"], name="newspaper_p_status_9572d3_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "published_at"],
+                name="newspaper_p_categor_32b298_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0007_post_comment_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="featured_image_sizes",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
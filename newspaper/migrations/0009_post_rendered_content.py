@@ -0,0 +1,111 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:37
+
+from html import unescape
+import math
+import re
+
+import bleach
+from bleach.html5lib_shim import Filter
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# frozen copy of newspaper.content.process_content() as of this migration
+ALLOWED_TAGS = set(
+    """
+    a b blockquote br code div em figcaption figure h1 h2 h3 h4 h5 h6 hr i
+    iframe img li ol p pre s span strike strong sub sup table tbody td th
+    thead tr u ul
+    """.split()
+)
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "target", "rel"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "iframe": ["src", "width", "height", "frameborder", "allowfullscreen"],
+    "td": ["colspan", "rowspan"],
+    "th": ["colspan", "rowspan"],
+}
+BLOCK_END = re.compile(r"</(p|div|li|h[1-6]|blockquote|td|tr)>|<br\s*/?>", re.I)
+NON_TEXT = re.compile(r"<(script|style)\b.*?</\1\s*>", re.I | re.S)
+
+
+class LazyLoadFilter(Filter):
+    def __iter__(self):
+        for token in super().__iter__():
+            if token["type"] in ("StartTag", "EmptyTag") and token["name"] in (
+                "img",
+                "iframe",
+            ):
+                token["data"].setdefault((None, "loading"), "lazy")
+                if token["name"] == "img":
+                    token["data"].setdefault((None, "decoding"), "async")
+            yield token
+
+
+def process_content(html):
+    cleaner = bleach.Cleaner(
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols={"http", "https", "mailto"},
+        strip=True,
+        filters=[LazyLoadFilter],
+    )
+    text = " ".join(
+        unescape(strip_tags(BLOCK_END.sub(" ", NON_TEXT.sub("", html)))).split()
+    )
+    word_count = len(text.split())
+    return {
+        "content_html": cleaner.clean(NON_TEXT.sub("", html)),
+        "content_text": text,
+        "excerpt": Truncator(text).chars(177),
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / 200),
+    }
+
+
+FIELDS = ["content_html", "content_text", "excerpt", "word_count", "reading_time"]
+
+
+def render_contents(apps, schema_editor):
+    Post = apps.get_model("newspaper", "Post")
+    posts = Post.objects.only("id", "content")
+    batch = []
+    for post in posts.iterator(chunk_size=500):
+        for field, value in process_content(post.content).items():
+            setattr(post, field, value)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, FIELDS)
+            batch = []
+    Post.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0008_post_featured_image_sizes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="content_text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="reading_time",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_contents, migrations.RunPython.noop),
+    ]
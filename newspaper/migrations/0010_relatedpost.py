@@ -0,0 +1,57 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0009_post_rendered_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_entries",
+                        to="newspaper.post",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_by",
+                        to="newspaper.post",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="relatedpost",
+            index=models.Index(
+                fields=["post", "-score"], name="newspaper_r_post_id_807b53_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="relatedpost",
+            constraint=models.UniqueConstraint(
+                fields=("post", "related"), name="unique_related_post"
+            ),
+        ),
+    ]
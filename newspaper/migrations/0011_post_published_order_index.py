@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0010_relatedpost"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="post",
+            name="newspaper_p_status_62c7d1_idx",
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["status", "published_at", "id"],
+                name="newspaper_p_status_880bde_idx",
+            ),
+        ),
+    ]
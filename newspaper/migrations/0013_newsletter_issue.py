@@ -0,0 +1,91 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0012_post_comment_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NewsletterIssue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("subject", models.CharField(max_length=200)),
+                ("since", models.DateTimeField()),
+                ("until", models.DateTimeField()),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "posts",
+                    models.ManyToManyField(related_name="+", to="newspaper.post"),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="NewsletterDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("email", models.EmailField(max_length=254)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "issue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="newspaper.newsletterissue",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="newsletterdelivery",
+            index=models.Index(
+                fields=["issue", "status", "id"], name="newspaper_n_issue_i_cd4d2f_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="newsletterdelivery",
+            constraint=models.UniqueConstraint(
+                fields=("issue", "email"), name="unique_newsletter_delivery"
+            ),
+        ),
+    ]
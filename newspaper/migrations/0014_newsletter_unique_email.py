@@ -0,0 +1,60 @@
+# Generated by Django 4.1.5 on 2026-10-17 00:01
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+import django.db.models.functions.text
+
+CHUNK_SIZE = 1000
+
+
+def collapse_duplicates(apps, schema_editor):
+    """
+    Normalize the subscriber addresses and keep the oldest subscriber of
+    each, working through the table in chunks.
+    """
+    NewsLetter = apps.get_model("newspaper", "NewsLetter")
+    last = 0
+    while True:
+        chunk = list(
+            NewsLetter.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        NewsLetter.objects.filter(pk__gte=chunk[0], pk__lte=chunk[-1]).update(
+            email=Lower(Trim("email"))
+        )
+        last = chunk[-1]
+
+    # one sorted pass: every row after the first of its address goes
+    duplicates = []
+    previous = None
+    rows = NewsLetter.objects.order_by("email", "pk").values_list("pk", "email")
+    for pk, email in rows.iterator(chunk_size=CHUNK_SIZE):
+        if email == previous:
+            duplicates.append(pk)
+        previous = email
+    for start in range(0, len(duplicates), CHUNK_SIZE):
+        NewsLetter.objects.filter(
+            pk__in=duplicates[start : start + CHUNK_SIZE]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0013_newsletter_issue"),
+    ]
+
+    operations = [
+        migrations.RunPython(collapse_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="newsletter",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="unique_newsletter_email",
+                violation_error_message="This address is already subscribed.",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-17 00:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0014_newsletter_unique_email"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="contact",
+            options={"ordering": ["created_at"]},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-17 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0015_contact_ordering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="queue_token",
+            field=models.UUIDField(editable=False, null=True, unique=True),
+        ),
+    ]
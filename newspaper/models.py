@@ -1,4 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Lower
+
+from newspaper import images
+from newspaper.content import process_content
 
 
 class TimeStampModel(models.Model):
@@ -23,6 +28,68 @@ class Tag(TimeStampModel):
         return self.name
 
 
+# the bulky text columns of a post
+CONTENT_FIELDS = ("content", "content_html", "content_text")
+# kept up to date with update(), never written by Post.save() on an update
+COUNTER_FIELDS = ("comment_count", "views_count")
+
+
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Projection for post lists: everything but the full content."""
+        return (
+            self.defer(*CONTENT_FIELDS)
+            .select_related("category")
+            .prefetch_related("tag")
+        )
+
+    def for_detail(self):
+        """The post detail page: post, author, category and tags."""
+        return (
+            self.defer("content", "content_text")
+            .select_related("author", "category")
+            .prefetch_related("tag")
+        )
+
+    def adjacent_to(self, post):
+        """
+        The published posts just before and after ``post`` in publication
+        order, ``(published_at, id)``, in one query of two index lookups.
+        """
+        published = self.filter(status="published", published_at__isnull=False)
+        at = post.published_at
+        previous = published.filter(
+            models.Q(published_at__lt=at) | models.Q(published_at=at, pk__lt=post.pk)
+        ).order_by("-published_at", "-id")
+        following = published.filter(
+            models.Q(published_at__gt=at) | models.Q(published_at=at, pk__gt=post.pk)
+        ).order_by("published_at", "id")
+        return published.filter(
+            models.Q(pk=Subquery(previous.values("pk")[:1]))
+            | models.Q(pk=Subquery(following.values("pk")[:1]))
+        ).defer(*CONTENT_FIELDS)
+
+    def with_latest_comments(self, limit=10):
+        """
+        Prefetch the ``limit`` latest comments of every post into
+        ``post.prefetched_comments`` with a single query.
+        """
+        latest = Subquery(
+            Comment.objects.filter(post=OuterRef("post"))
+            .order_by("-created_at", "-id")
+            .values("pk")[:limit]
+        )
+        return self.prefetch_related(
+            models.Prefetch(
+                "comment_set",
+                queryset=Comment.objects.filter(pk__in=latest).order_by(
+                    "-created_at", "-id"
+                ),
+                to_attr="prefetched_comments",
+            )
+        )
+
+
 class Post(TimeStampModel):
     STATUS_CHOICES = (
         ("published", "Published"),
@@ -30,19 +97,64 @@ class Post(TimeStampModel):
     )
     title = models.CharField(max_length=255)
     content = models.TextField()
+    # derived from content on save, see newspaper.content.process_content
+    content_html = models.TextField(blank=True, editable=False)
+    content_text = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
     featured_image = models.ImageField(upload_to="post_images/%Y/%m/%d", blank=False)
+    # {size name: width} of the derivatives written by newspaper.images
+    featured_image_sizes = models.JSONField(default=dict, blank=True, editable=False)
     author = models.ForeignKey("auth.User", on_delete=models.CASCADE)
     published_at = models.DateTimeField(null=True, blank=True)
     views_count = models.PositiveBigIntegerField(default=0)
+    # maintained by Comment.save() and newspaper.signals, repaired by the
+    # reconcile_comment_counts command
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     status = models.CharField(
         max_length=20, choices=STATUS_CHOICES, default="unpublished"
     )
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     tag = models.ManyToManyField(Tag)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # published lists: filter on status, order by (published_at, id),
+            # also walked by adjacent_to(), or by views
+            models.Index(fields=["status", "published_at", "id"]),
+            models.Index(fields=["status", "views_count"]),
+            models.Index(fields=["category", "published_at"]),
+        ]
+
     def __str__(self):
         return self.title
 
+    @property
+    def featured_image_srcset(self):
+        return images.srcset(self.featured_image.name, self.featured_image_sizes)
+
+    @property
+    def featured_image_webp_srcset(self):
+        return images.srcset(
+            self.featured_image.name, self.featured_image_sizes, webp=True
+        )
+
+    def save(self, *args, **kwargs):
+        if "content" in self.__dict__:  # skip when content is deferred
+            for field, value in process_content(self.content).items():
+                setattr(self, field, value)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # the counts in memory may be stale, they are only changed by update()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     # Fat model and thin views
     @property
     def latest_comments(self):
@@ -50,12 +162,124 @@ class Post(TimeStampModel):
         return comments
 
 
+class RelatedPost(models.Model):
+    """Precomputed most related posts of a post, see newspaper.related."""
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="related_entries"
+    )
+    related = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="related_by"
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "related"], name="unique_related_post"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["post", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.2f})"
+
+
+def normalize_email(email):
+    """The form subscriber addresses are stored and compared in."""
+    return email.strip().lower()
+
+
+class NewsLetterQuerySet(models.QuerySet):
+    def with_email(self, email):
+        """Subscribers of ``email`` in any case, an index lookup."""
+        return self.alias(normalized=Lower("email")).filter(
+            normalized=normalize_email(email)
+        )
+
+    def subscribe(self, email):
+        """
+        ``(subscriber, created)`` of ``email``; subscribing an address again
+        returns its existing subscriber.
+        """
+        subscriber = self.with_email(email).first()
+        if subscriber is not None:
+            return subscriber, False
+        try:
+            with transaction.atomic():
+                return self.create(email=email), True
+        except IntegrityError:  # subscribed concurrently
+            return self.with_email(email).get(), False
+
+
 class NewsLetter(TimeStampModel):
     email = models.EmailField()
 
+    objects = NewsLetterQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower("email"),
+                name="unique_newsletter_email",
+                violation_error_message="This address is already subscribed.",
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
+
+class NewsletterIssue(TimeStampModel):
+    """Digest of the posts published in ``(since, until]``."""
+
+    subject = models.CharField(max_length=200)
+    since = models.DateTimeField()
+    until = models.DateTimeField()
+    posts = models.ManyToManyField(Post, related_name="+")
+    # set once every delivery is sent or out of attempts
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.subject
+
+
+class NewsletterDelivery(models.Model):
+    """The delivery of an issue to one subscriber address."""
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+    issue = models.ForeignKey(
+        NewsletterIssue, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["issue", "email"], name="unique_newsletter_delivery"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["issue", "status", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.issue_id} -> {self.email} ({self.status})"
+
 
 class Contact(TimeStampModel):
     subject = models.CharField(max_length=200)
@@ -76,6 +300,23 @@ class Comment(TimeStampModel):
     message = models.TextField()
     name = models.CharField(max_length=50)
     email = models.EmailField()
+    # set on comments written from the queue, a redelivered one is skipped
+    queue_token = models.UUIDField(null=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "created_at"]),
+        ]
 
     def __str__(self):
         return self.message[:70]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Post.objects.filter(pk=self.post_id).update(
+                    comment_count=F("comment_count") + 1
+                )
+
@@ -1,31 +1,107 @@
-from django.db.models import Case, F, Sum, When
+import logging
+import time
 
-from newspaper.models import Category, Post, Tag
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils.functional import SimpleLazyObject
 
+from newspaper.home_feed import FEED_FIELDS, FeedPost, published_posts
+from newspaper.models import Category, Tag
 
-def navigation(request):
-    categories = Category.objects.all()
-    top_categories = (
-        Post.objects.values("category__pk", "category__name")
-        .annotate(
-            pk=F("category__pk"), name=F("category__name"), max_views=Sum("views_count")
-        )
-        .order_by("-views_count")
-        .values("pk", "name", "max_views")
-    )
-    category_ids = [top_category["pk"] for top_category in top_categories] # [2,6,5,6]
-    order_by_max_views = Case(
-        *[
-            When(id=category["pk"], then=category["max_views"]) #When(id=2, then=11), When(id=6,then=2)
-            for category in top_categories
-        ]
+logger = logging.getLogger(__name__)
+
+# bumped by newspaper.signals whenever a post, category or tag changes, which
+# orphans the cached navigation of the previous version.
+VERSION_KEY = "navigation:version"
+HITS_KEY = "navigation:hits"
+MISSES_KEY = "navigation:misses"
+
+published = Q(post__status="published", post__published_at__isnull=False)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def navigation_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_navigation_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def navigation_cache_stats():
+    """
+    Counters of the navigation cache lookups, of every process with a shared
+    cache, of this process only with a local one (they are logged on misses).
+    """
+    return {
+        "version": navigation_version(),
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+def top_categories_by_views():
+    return (
+        Category.objects.annotate(max_views=Sum("post__views_count", filter=published))
+        .filter(max_views__isnull=False)
+        .order_by("-max_views")
     )
-    top_categories = Category.objects.filter(pk__in=category_ids).order_by(
-        -order_by_max_views
+
+
+def build_navigation():
+    categories = list(
+        Category.objects.annotate(post_count=Count("post", filter=published))
     )
-    tags = Tag.objects.all()[:10]
+    top_categories = list(top_categories_by_views())
+    tags = list(Tag.objects.all()[:10])
+    recent_posts = published_posts().order_by("-published_at", "-id")[:4]
     return {
         "categories": categories,
         "top_categories": top_categories,
         "tags": tags,
+        # sidebar of the post detail page
+        "recent_posts": [
+            FeedPost(*row) for row in recent_posts.values_list(*FEED_FIELDS)
+        ],
+    }
+
+
+def get_navigation():
+    key = f"navigation:{navigation_version()}"
+    data = cache.get(key)
+    if data is None:
+        _incr(MISSES_KEY)
+        stats = navigation_cache_stats()
+        logger.info(
+            "Navigation cache miss, version %s: %s hits, %s misses",
+            stats["version"],
+            stats["hits"],
+            stats["misses"],
+        )
+        data = build_navigation()
+        cache.set(key, data, timeout=settings.NAVIGATION_CACHE_TIMEOUT)
+    else:
+        _incr(HITS_KEY)
+    return data
+
+
+def navigation(request):
+    # nothing is read from the cache or the database until a template
+    # actually renders one of these.
+    data = SimpleLazyObject(get_navigation)
+    return {
+        "categories": SimpleLazyObject(lambda: data["categories"]),
+        "top_categories": SimpleLazyObject(lambda: data["top_categories"]),
+        "tags": SimpleLazyObject(lambda: data["tags"]),
     }
@@ -0,0 +1,199 @@
+"""
+Newsletter digests sent to the ``NewsLetter`` subscribers.
+
+``create_issue()`` picks the posts published since the previous issue and
+adds a ``NewsletterDelivery`` for every subscriber. ``send()`` renders the
+issue once, text and HTML, and sends the pending deliveries in batches from a
+thread pool; each batch goes through one email connection (one SMTP session)
+that is reused for all its messages. The state of every delivery is
+saved as its batch completes, so a run that is interrupted or fails is
+resumed with ``send()`` again: sent deliveries are skipped and failed ones
+are retried up to ``NEWSLETTER_MAX_ATTEMPTS`` times.
+
+Only the calling thread touches the database; the pool threads just send.
+Both run from the ``send_newsletter`` command, through whatever
+``EMAIL_BACKEND`` is configured (the locmem or file backends, or a local
+debugging SMTP server, in development).
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Max
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from newspaper.models import NewsLetter, NewsletterDelivery, NewsletterIssue, Post
+
+# days a first issue looks back
+FIRST_ISSUE_DAYS = 7
+
+
+def digest_posts(since, until, limit=None):
+    """The most recent posts published in ``(since, until]``."""
+    return (
+        Post.objects.filter(
+            status="published", published_at__gt=since, published_at__lte=until
+        )
+        .for_list()
+        .order_by("-published_at", "-id")[: limit or settings.NEWSLETTER_MAX_POSTS]
+    )
+
+
+def subscriber_emails():
+    return NewsLetter.objects.order_by("pk").values_list("email", flat=True)
+
+
+def add_recipients(issue, batch_size=1000):
+    """Add a pending delivery of ``issue`` for every subscriber, returns the count."""
+    batch = []
+    for email in subscriber_emails().iterator(chunk_size=batch_size):
+        batch.append(NewsletterDelivery(issue=issue, email=email))
+        if len(batch) == batch_size:
+            NewsletterDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    NewsletterDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+    return issue.deliveries.count()
+
+
+@transaction.atomic
+def create_issue(since=None, until=None, subject=None):
+    """
+    An issue of the posts published since ``since`` (by default the end of
+    the previous issue) with its deliveries, or None when there are no posts.
+    """
+    until = until or timezone.now()
+    if since is None:
+        since = NewsletterIssue.objects.aggregate(last=Max("until"))["last"]
+    since = since or until - timedelta(days=FIRST_ISSUE_DAYS)
+    posts = list(digest_posts(since, until))
+    if not posts:
+        return None
+    issue = NewsletterIssue.objects.create(
+        subject=subject or f"AZNews: {posts[0].title}", since=since, until=until
+    )
+    issue.posts.set(posts)
+    add_recipients(issue)
+    return issue
+
+
+def render(issue):
+    """``(text, html)`` bodies of ``issue``, the same for every subscriber."""
+    site = settings.NEWSLETTER_SITE_URL.rstrip("/")
+    posts = issue.posts.for_list().order_by("-published_at", "-id")
+    for post in posts:
+        post.url = site + reverse("post-detail", args=[post.pk])
+    context = {"issue": issue, "posts": posts, "site_url": site}
+    return (
+        render_to_string("newsletter/digest.txt", context),
+        render_to_string("newsletter/digest.html", context),
+    )
+
+
+def build_message(subject, text, html, email, connection):
+    message = EmailMultiAlternatives(
+        subject,
+        text,
+        settings.NEWSLETTER_FROM_EMAIL,
+        [email],
+        connection=connection,
+    )
+    message.attach_alternative(html, "text/html")
+    return message
+
+
+def send_batch(subject, text, html, deliveries):
+    """
+    Send ``[(delivery id, email)]`` over one connection, returns the ids sent
+    and ``{id: error}`` of the others.
+    """
+    sent, failed = [], {}
+    connection = get_connection()
+    try:
+        connection.open()
+        for pk, email in deliveries:
+            try:
+                connection.send_messages(
+                    [build_message(subject, text, html, email, connection)]
+                )
+            except smtplib.SMTPServerDisconnected as error:
+                failed[pk] = repr(error)
+                connection.close()
+                connection.open()  # raises when the server is gone for good
+            except (smtplib.SMTPException, OSError) as error:
+                failed[pk] = repr(error)
+            else:
+                sent.append(pk)
+    except (smtplib.SMTPException, OSError) as error:
+        for pk, _ in deliveries:
+            if pk not in failed and pk not in sent:
+                failed[pk] = repr(error)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def save_results(sent, failed):
+    now = timezone.now()
+    with transaction.atomic():
+        NewsletterDelivery.objects.filter(pk__in=sent).update(
+            status="sent", sent_at=now, error="", attempts=F("attempts") + 1
+        )
+        for pk, error in failed.items():
+            NewsletterDelivery.objects.filter(pk=pk).update(
+                status="failed", error=error, attempts=F("attempts") + 1
+            )
+
+
+def unsent(issue):
+    """Deliveries of ``issue`` left to send, pending or failed and retriable."""
+    return issue.deliveries.filter(status__in=["pending", "failed"]).filter(
+        attempts__lt=settings.NEWSLETTER_MAX_ATTEMPTS
+    )
+
+
+def batches(deliveries, batch_size):
+    """``[(id, email)]`` batches of ``deliveries`` in id order, read in batches."""
+    last = 0
+    while True:
+        batch = list(
+            deliveries.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", "email")[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def send(issue, batch_size=None, threads=None):
+    """Send the unsent deliveries of ``issue`` once, returns ``(sent, failed)``."""
+    batch_size = batch_size or settings.NEWSLETTER_BATCH_SIZE
+    threads = threads or settings.NEWSLETTER_THREADS
+    text, html = render(issue)
+    totals = [0, 0]
+
+    def save(futures):
+        for future in futures:
+            sent, failed = future.result()
+            save_results(sent, failed)
+            totals[0] += len(sent)
+            totals[1] += len(failed)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        running = set()
+        # read in id order, so deliveries failing in this run are not retried
+        for batch in batches(unsent(issue), batch_size):
+            running.add(executor.submit(send_batch, issue.subject, text, html, batch))
+            if len(running) >= threads * 2:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                save(done)
+        save(wait(running).done)
+    if not unsent(issue).exists():
+        NewsletterIssue.objects.filter(pk=issue.pk).update(sent_at=timezone.now())
+    return tuple(totals)
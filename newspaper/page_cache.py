@@ -0,0 +1,174 @@
+"""
+Full-page cache of the public pages for anonymous readers.
+
+Pages are grouped (the home page, one post, one category, one tag, the post
+list) and every group has a version in the cache, part of the cache key of
+its pages. ``purge()`` bumps versions, which drops the pages of just those
+groups; ``newspaper.signals`` purges the groups a post appears in whenever it
+is saved, deleted or commented on. Shared parts of the pages (navigation,
+sidebars) may lag behind by up to ``settings.PAGE_CACHE_TIMEOUT``.
+
+Purging only reaches the processes sharing the cache, so the middleware turns
+itself off on a cache local to each process (the local memory cache), unless
+``settings.PAGE_CACHE_PER_PROCESS`` says the site runs in one process.
+
+Cached pages never contain a CSRF token: the forms read it from the CSRF
+cookie, which the middleware sets on every HTML response. Post views are counted
+by a beacon the detail page sends to ``PostViewCountView``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, has_vary_header
+from django.utils.http import parse_http_date_safe
+
+from newspaper import shared_cache
+
+HIT_HEADER = "X-Page-Cache"
+MIDDLEWARE_PATH = "newspaper.page_cache.AnonymousPageCacheMiddleware"
+
+# view -> group of its pages
+GROUPS = {
+    "newspaper.views.HomeView": lambda kwargs: "home",
+    "newspaper.views.PostListView": lambda kwargs: "post-list",
+    "newspaper.views.PostDetailView": lambda kwargs: f"post:{kwargs['pk']}",
+    "newspaper.views.PostByCategory": lambda kwargs: f"category:{kwargs['cat_id']}",
+    "newspaper.views.PostByTag": lambda kwargs: f"tag:{kwargs['tag_id']}",
+}
+
+
+def _version_key(group):
+    return f"page:version:{group}"
+
+
+def page_group(path):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    view = getattr(match.func, "view_class", None)
+    if view is None:
+        return None
+    group = GROUPS.get(f"{view.__module__}.{view.__qualname__}")
+    return group(match.kwargs) if group else None
+
+
+def page_key(group, full_path):
+    version = cache.get_or_set(_version_key(group), time.time_ns, timeout=None)
+    digest = hashlib.md5(full_path.encode()).hexdigest()
+    return f"page:{group}:{version}:{digest}"
+
+
+def purge(groups):
+    for group in set(groups):
+        try:
+            cache.incr(_version_key(group))
+        except ValueError:
+            pass  # nothing cached under this group yet
+
+
+def post_groups(post, tag_ids=None, category_ids=()):
+    """Groups of the pages ``post`` is shown on."""
+    if tag_ids is None:
+        tag_ids = post.tag.values_list("pk", flat=True) if post.pk else []
+    category_ids = {post.category_id, *category_ids} - {None}
+    return [
+        "home",
+        "post-list",
+        f"post:{post.pk}",
+        *(f"category:{category_id}" for category_id in category_ids),
+        *(f"tag:{tag_id}" for tag_id in tag_ids),
+    ]
+
+
+def is_enabled():
+    return shared_cache.is_shared(caches["default"]) or settings.PAGE_CACHE_PER_PROCESS
+
+
+@checks.register(checks.Tags.caches)
+def check_page_cache(app_configs, **kwargs):
+    if is_enabled() or MIDDLEWARE_PATH not in settings.MIDDLEWARE:
+        return []
+    return [
+        checks.Warning(
+            "The page cache is disabled: the default cache is local to each "
+            "process, which would keep serving the pages purged in another.",
+            hint="Use a shared cache (memcached, redis), or set "
+            "PAGE_CACHE_PER_PROCESS on a single-process server.",
+            id="newspaper.W001",
+        )
+    ]
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Serve GET requests of anonymous readers for the pages in ``GROUPS`` from
+    the cache. Goes after the authentication and session middlewares.
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed("The page cache needs a shared cache.")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = self.cache_key(request)
+        response = self.cached_response(request, key) if key else None
+        if response is None:
+            response = self.get_response(request)
+            if key and self.is_cacheable(request, response):
+                cache.set(
+                    key,
+                    (response.status_code, list(response.items()), response.content),
+                    timeout=settings.PAGE_CACHE_TIMEOUT,
+                )
+                response[HIT_HEADER] = "miss"
+        if response.get("Content-Type", "").startswith("text/html"):
+            # forms of cached pages read the token from the CSRF cookie
+            get_token(request)
+        return response
+
+    def cache_key(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if request.user.is_authenticated or not request.session.is_empty():
+            return None
+        group = page_group(request.path_info)
+        if group is None:
+            return None
+        return page_key(group, request.get_full_path())
+
+    def cached_response(self, request, key):
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        status, headers, content = cached
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        response[HIT_HEADER] = "hit"
+        return get_conditional_response(
+            request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+            response=response,
+        )
+
+    def is_cacheable(self, request, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            # a rendered {% csrf_token %} belongs to this visitor only,
+            # get_token() flags the request when the view or template used it
+            and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            and not has_vary_header(response, "Authorization")
+            and "private" not in response.get("Cache-Control", "")
+        )
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination for post lists.
+
+Pages are cut with ``WHERE (published_at, id) < (cursor)`` instead of
+``OFFSET``, so page 500 costs the same as page 1 and no ``COUNT(*)`` is run.
+Cursors are opaque base64 tokens of the boundary row's key.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+import json
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# larger keys overflow the database integer
+MAX_PK = 2**63
+
+
+def encode_cursor(post, reverse):
+    position = [post.published_at.isoformat(), post.pk, reverse]
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """``(published_at, pk, reverse)`` of ``cursor``, BadRequest (400) if invalid."""
+    try:
+        published_at, pk, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+        published_at = parse_datetime(published_at)
+    except (binascii.Error, TypeError, ValueError):
+        raise BadRequest("Invalid cursor")
+    if published_at is None or type(pk) is not int or not 0 < pk < MAX_PK:
+        raise BadRequest("Invalid cursor")
+    if timezone.is_naive(published_at):
+        published_at = timezone.make_aware(published_at)
+    return published_at, pk, bool(reverse)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating newest first on ``(published_at, id)``.
+    Templates get ``page_obj.next_cursor`` / ``page_obj.previous_cursor``.
+    """
+
+    paginate_by = 10
+    cursor_kwarg = "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        queryset = queryset.order_by("-published_at", "-id")
+        reverse = False
+        if cursor:
+            published_at, pk, reverse = decode_cursor(cursor)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(published_at__gt=published_at)
+                    | Q(published_at=published_at, pk__gt=pk)
+                ).reverse()
+            else:
+                queryset = queryset.filter(
+                    Q(published_at__lt=published_at)
+                    | Q(published_at=published_at, pk__lt=pk)
+                )
+
+        # one extra row tells whether there is a page beyond this one
+        posts = list(queryset[: page_size + 1])
+        has_more = len(posts) > page_size
+        posts = posts[:page_size]
+        if reverse:
+            posts.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        page = KeysetPage(
+            posts,
+            next_cursor=encode_cursor(posts[-1], False) if posts and has_next else None,
+            previous_cursor=(
+                encode_cursor(posts[0], True) if posts and has_previous else None
+            ),
+        )
+        return (None, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,193 @@
+"""
+Related posts of the post detail page.
+
+Two published posts are related by the tags they share and by being in the
+same category:
+
+    score = TAG_WEIGHT * shared tags + CATEGORY_WEIGHT * same category
+
+The ``settings.RELATED_POSTS_COUNT`` best scored posts of every published
+post are stored in ``RelatedPost``, the detail page reads them with one
+indexed query. ``refresh()`` updates the lists a post change can affect
+(``newspaper.signals`` calls it when a post is saved or retagged) and
+``rebuild()`` recomputes all of them from the tag and category lists, both
+give the same scores.
+"""
+from collections import Counter, defaultdict
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from newspaper.models import CONTENT_FIELDS, Post, RelatedPost
+
+TAG_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+
+PostTag = Post.tag.through
+
+
+def published_posts():
+    return Post.objects.filter(status="published", published_at__isnull=False)
+
+
+def is_published(post):
+    return post.status == "published" and post.published_at is not None
+
+
+def related_posts(post):
+    return list(
+        Post.objects.filter(related_by__post=post)
+        .defer(*CONTENT_FIELDS)
+        .order_by("-related_by__score", "-id")
+    )
+
+
+def top(scores, count):
+    """The ``count`` best ``(post id, score)``, newer posts first on ties."""
+    return heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def scores_for(post):
+    """``{post id: score}`` of the published posts related to ``post``."""
+    tag_ids = PostTag.objects.filter(post=post.pk).values("tag_id")
+    shared_tags = (
+        PostTag.objects.filter(tag_id__in=tag_ids, post__in=published_posts())
+        .exclude(post=post.pk)
+        .values_list("post_id")
+        .annotate(shared=Count("tag_id"))
+    )
+    scores = Counter()
+    for post_id, shared in shared_tags:
+        scores[post_id] += TAG_WEIGHT * shared
+    same_category = (
+        published_posts()
+        .filter(category=post.category_id)
+        .exclude(pk=post.pk)
+        .values_list("pk", flat=True)
+    )
+    for post_id in same_category:
+        scores[post_id] += CATEGORY_WEIGHT
+    return scores
+
+
+def store(post_id, ranked):
+    RelatedPost.objects.filter(post=post_id).delete()
+    RelatedPost.objects.bulk_create(
+        RelatedPost(post_id=post_id, related_id=related_id, score=score)
+        for related_id, score in ranked
+    )
+
+
+def recompute(post_ids):
+    count = settings.RELATED_POSTS_COUNT
+    for post in published_posts().filter(pk__in=post_ids).only("id", "category_id"):
+        store(post.pk, top(scores_for(post), count))
+
+
+def trim(post_ids):
+    """Drop the entries beyond ``RELATED_POSTS_COUNT`` of the lists of ``post_ids``."""
+    lists = defaultdict(list)
+    rows = RelatedPost.objects.filter(post__in=post_ids).values_list(
+        "pk", "post_id", "related_id", "score"
+    )
+    for pk, post_id, related_id, score in rows:
+        lists[post_id].append((-score, -related_id, pk))
+    extra = [
+        pk
+        for entries in lists.values()
+        for _, _, pk in sorted(entries)[settings.RELATED_POSTS_COUNT :]
+    ]
+    RelatedPost.objects.filter(pk__in=extra).delete()
+
+
+@transaction.atomic
+def refresh(post):
+    """
+    Update the related posts after ``post`` was published, unpublished,
+    edited or retagged. Scores are symmetric, so the scores of ``post`` also
+    tell which other lists it enters; those are merged in place. Only the
+    lists ``post`` drops out of (or falls in) are computed again.
+    """
+    if post.pk is None:  # deleted before the transaction saving it committed
+        return
+    count = settings.RELATED_POSTS_COUNT
+    previous = dict(
+        RelatedPost.objects.filter(related=post.pk).values_list("post_id", "score")
+    )
+    scores = scores_for(post) if is_published(post) else {}
+    store(post.pk, top(scores, count))
+
+    stale = {other for other, score in previous.items() if scores.get(other, 0) < score}
+    lists = (
+        RelatedPost.objects.filter(post__in=list(scores))
+        .exclude(related=post.pk)
+        .values_list("post")
+        .annotate(size=Count("pk"), lowest=Min("score"))
+    )
+    lists = {other: (size, lowest) for other, size, lowest in lists}
+    entering = {
+        other: score
+        for other, score in scores.items()
+        if other not in stale
+        and (
+            other in previous
+            or lists.get(other, (0, 0))[0] < count
+            or score >= lists[other][1]
+        )
+    }
+    RelatedPost.objects.filter(post__in=list(entering), related=post.pk).delete()
+    RelatedPost.objects.bulk_create(
+        RelatedPost(post_id=other, related_id=post.pk, score=score)
+        for other, score in entering.items()
+    )
+    trim(list(entering))
+    recompute(stale)
+
+
+def rebuild(batch_size=1000):
+    """Recompute the related posts of every published post, return their number."""
+    count = settings.RELATED_POSTS_COUNT
+    posts = list(published_posts().order_by("id").values_list("pk", "category_id"))
+    tags = list(
+        PostTag.objects.filter(post__in=published_posts()).values_list(
+            "post_id", "tag_id"
+        )
+    )
+    ranked = _rank(posts, tags, count)
+
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        batch = []
+        for post_id, entries in ranked:
+            batch.extend(
+                RelatedPost(post_id=post_id, related_id=related_id, score=score)
+                for related_id, score in entries
+            )
+            if len(batch) >= batch_size:
+                RelatedPost.objects.bulk_create(batch)
+                batch = []
+        RelatedPost.objects.bulk_create(batch)
+    return len(posts)
+
+
+def _rank(posts, tags, count):
+    posts_by_tag = defaultdict(list)
+    tags_by_post = defaultdict(list)
+    for post_id, tag_id in tags:
+        posts_by_tag[tag_id].append(post_id)
+        tags_by_post[post_id].append(tag_id)
+    posts_by_category = defaultdict(list)
+    for post_id, category_id in posts:
+        posts_by_category[category_id].append(post_id)
+
+    for post_id, category_id in posts:
+        scores = Counter()
+        for tag_id in tags_by_post[post_id]:
+            for other in posts_by_tag[tag_id]:
+                scores[other] += TAG_WEIGHT
+        for other in posts_by_category[category_id]:
+            scores[other] += CATEGORY_WEIGHT
+        scores.pop(post_id, None)
+        yield post_id, top(scores, count)
@@ -0,0 +1,285 @@
+"""
+Full-text search over published posts.
+
+Posts are indexed as HTML-stripped text in a search table that is kept in
+sync by the post save/delete signals (see ``newspaper.signals``). The backend
+is picked from ``settings.SEARCH_BACKEND`` or, when that is ``None``, from the
+database vendor:
+
+    sqlite      -> FTS5 virtual table ranked with bm25()
+    postgresql  -> tsvector column with a GIN index ranked with ts_rank()
+    others      -> icontains fallback without ranking
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.text import Truncator
+
+from newspaper.models import Post
+
+SEARCH_TABLE = "newspaper_post_search"
+
+# snippets are highlighted with these markers and escaped afterwards, so the
+# indexed text never reaches the template unescaped.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+def render_snippet(snippet):
+    return (
+        escape(snippet or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+    )
+
+
+def is_indexable(post):
+    return post.status == "published" and post.published_at is not None
+
+
+class SearchResults:
+    """
+    Lazy, sliceable result set so it can be handed to Paginator or DRF
+    pagination: only ``count()`` and the requested page hit the database.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item : item + 1][0]
+        offset = item.start or 0
+        limit = (item.stop if item.stop is not None else self.count()) - offset
+        if limit <= 0:
+            return []
+        hits = self.backend.hits(self.query, limit, offset)
+        posts = Post.objects.for_list().in_bulk(
+            [post_id for post_id, rank, snippet in hits]
+        )
+        results = []
+        for post_id, rank, snippet in hits:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.search_rank = rank
+            post.snippet = render_snippet(snippet)
+            results.append(post)
+        return results
+
+
+class EmptyResults(list):
+    def count(self):
+        return 0
+
+
+class BaseSearchBackend:
+    def search(self, query):
+        query = query.strip()
+        if not query:
+            return EmptyResults()
+        return SearchResults(self, query)
+
+    def update(self, post):
+        if is_indexable(post):
+            self.index([post])
+        else:
+            self.remove(post.pk)
+
+    def rebuild(self, batch_size=500):
+        self.clear()
+        posts = (
+            Post.objects.filter(status="published", published_at__isnull=False)
+            .only("id", "title", "content_text")
+            .order_by("id")
+        )
+        batch = []
+        indexed = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) >= batch_size:
+                self.index(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            self.index(batch)
+            indexed += len(batch)
+        return indexed
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def hits(self, query, limit, offset):
+        """Return ``[(post_id, rank, snippet), ...]`` best match first."""
+        raise NotImplementedError
+
+    def index(self, posts):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    @staticmethod
+    def match_expression(query):
+        # quote every word so user input can't inject FTS5 query syntax,
+        # and prefix-match the words ("elect" finds "election").
+        terms = ['"%s"*' % term.replace('"', '""') for term in query.split()]
+        return " ".join(terms)
+
+    def count(self, query):
+        match = self.match_expression(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+                [match],
+            )
+            return cursor.fetchone()[0]
+
+    def hits(self, query, limit, offset):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank, "
+                f"snippet({SEARCH_TABLE}, 1, %s, %s, '...', 32) "
+                f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY rank LIMIT %s OFFSET %s",
+                [MARK_START, MARK_END, match, limit, offset],
+            )
+            # bm25() is "lower is better", flip it so higher rank is better
+            return [(row[0], -row[1], row[2]) for row in cursor.fetchall()]
+
+    def index(self, posts):
+        rows = [(post.pk, post.title, post.content_text) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                rows,
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    config = "english"
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {SEARCH_TABLE} "
+                f"WHERE document @@ websearch_to_tsquery(%s, %s)",
+                [self.config, query],
+            )
+            return cursor.fetchone()[0]
+
+    def hits(self, query, limit, offset):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id, ts_rank(document, q) AS rank, "
+                f"ts_headline(%s::regconfig, body, q, %s) "
+                f"FROM {SEARCH_TABLE}, websearch_to_tsquery(%s, %s) q "
+                f"WHERE document @@ q ORDER BY rank DESC LIMIT %s OFFSET %s",
+                [
+                    self.config,
+                    f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=32",
+                    self.config,
+                    query,
+                    limit,
+                    offset,
+                ],
+            )
+            return cursor.fetchall()
+
+    def index(self, posts):
+        rows = [(post.pk, post.title, post.content_text, self.config) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (post_id, title, body, document) "
+                f"VALUES (%s, %s, %s, "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                f"ON CONFLICT (post_id) DO UPDATE SET title = EXCLUDED.title, "
+                f"body = EXCLUDED.body, document = EXCLUDED.document",
+                [
+                    (post_id, title, body, config, title, config, body)
+                    for post_id, title, body, config in rows
+                ],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE post_id = %s", [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Unindexed ``icontains`` search for databases without a text index."""
+
+    def queryset(self, query):
+        return (
+            Post.objects.filter(status="published", published_at__isnull=False)
+            .filter(Q(title__icontains=query) | Q(content_text__icontains=query))
+            .order_by("-published_at")
+        )
+
+    def count(self, query):
+        return self.queryset(query).count()
+
+    def hits(self, query, limit, offset):
+        posts = self.queryset(query).values_list("id", "content_text")
+        return [
+            (post_id, 0, Truncator(text).words(32))
+            for post_id, text in posts[offset : offset + limit]
+        ]
+
+    def index(self, posts):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def clear(self):
+        pass
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    return VENDOR_BACKENDS.get(connection.vendor, DatabaseSearchBackend)()
@@ -0,0 +1,14 @@
+"""
+Whether a cache is seen by every process.
+
+The local memory cache (and the dummy cache) belongs to one process: what a
+web process or a management command stores, counts or invalidates there is
+invisible to every other process. Features that only work when all
+processes share their cache entries check the cache with ``is_shared()``.
+"""
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(cache):
+    return not isinstance(cache, (LocMemCache, DummyCache))
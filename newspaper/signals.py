@@ -0,0 +1,177 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from newspaper import comment_queue, conditional, images, page_cache, related, search
+from newspaper.models import Category, Comment, Post, RelatedPost, Tag
+from newspaper.navigation_context_processor import bump_navigation_version
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    search.get_backend().update(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_navigation(sender, **kwargs):
+    bump_navigation_version()
+
+
+@receiver(pre_save, sender=Post)
+def track_featured_image_upload(sender, instance, **kwargs):
+    # a freshly uploaded file is only committed to the storage by save()
+    image = instance.featured_image
+    instance._featured_image_uploaded = bool(image) and not image._committed
+
+
+@receiver(post_save, sender=Post)
+def generate_featured_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, "_featured_image_uploaded", False):
+        return
+    try:
+        sizes = images.generate_derivatives(instance.featured_image.name)
+    except OSError:
+        logger.exception("Cannot resize %s", instance.featured_image.name)
+        # the sizes of the previous image name derivatives this one lacks
+        sizes = {}
+    instance.featured_image_sizes = sizes
+    Post.objects.filter(pk=instance.pk).update(featured_image_sizes=sizes)
+
+
+def purge_pages(groups):
+    # purged once the change is visible, or a concurrent request could cache
+    # the page as it was
+    groups = list(groups)
+    transaction.on_commit(lambda: page_cache.purge(groups))
+
+
+@receiver(pre_save, sender=Post)
+def track_category_change(sender, instance, raw=False, **kwargs):
+    # the pages of the category a post moves out of show it too
+    instance._previous_category_id = None
+    if instance.pk and not raw:
+        instance._previous_category_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("category_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def purge_post_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_category_id", None)
+    purge_pages(page_cache.post_groups(instance, category_ids=[previous]))
+
+
+@receiver(pre_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    # tags are unlinked before post_delete is sent
+    purge_pages(page_cache.post_groups(instance))
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def purge_tagged_post_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        groups = [f"tag:{instance.pk}", *(f"post:{pk}" for pk in pk_set or ())]
+    else:
+        groups = page_cache.post_groups(instance, tag_ids=pk_set)
+    purge_pages(groups)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_commented_post_page(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge_pages([f"post:{instance.post_id}"])
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Post.tag.through)
+@receiver(comment_queue.comments_written)
+def bump_post_list_version(sender, raw=False, action=None, **kwargs):
+    if raw or action in ("pre_add", "pre_remove", "pre_clear"):
+        return
+    transaction.on_commit(conditional.bump_list_version)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    # deletes run in a transaction, the count goes with the comment
+    if isinstance(origin, Post):
+        return  # the post is deleted too
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F("comment_count") - 1, 0)
+    )
+
+
+@receiver([post_save, post_delete], sender=Category)
+def purge_category_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge_pages(["home", f"category:{instance.pk}"])
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def purge_tag_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge_pages([f"tag:{instance.pk}"])
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_posts(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: related.refresh(instance))
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def refresh_retagged_related_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        for post in Post.objects.filter(pk__in=pk_set or ()):
+            transaction.on_commit(lambda post=post: related.refresh(post))
+    else:
+        transaction.on_commit(lambda: related.refresh(instance))
+
+
+@receiver(pre_delete, sender=Post)
+def track_related_lists(sender, instance, **kwargs):
+    # the rows are gone with the post, the lists it was in must be recomputed
+    instance._related_lists = list(
+        RelatedPost.objects.filter(related=instance.pk).values_list(
+            "post_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Post)
+def recompute_related_lists(sender, instance, **kwargs):
+    post_ids = getattr(instance, "_related_lists", [])
+    if post_ids:
+        transaction.on_commit(lambda: related.recompute(post_ids))
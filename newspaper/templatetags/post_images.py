@@ -0,0 +1,43 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from newspaper import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(post, size, **attrs):
+    """
+    Render ``post.featured_image`` at the named size as a <picture> with WebP
+    and ``srcset`` candidates. Extra keyword arguments become <img> attributes:
+
+        {% post_image post "card" class="img-fluid" %}
+    """
+    image = post.featured_image
+    sizes = post.featured_image_sizes or {}
+    attrs.setdefault("alt", post.title)
+    attrs.setdefault("loading", "lazy")
+    if not sizes:  # derivatives not generated yet
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+
+    src = image.url
+    if size in sizes:
+        src = default_storage.url(images.derivative_name(image.name, size))
+    width = settings.POST_IMAGE_SIZES[size]
+    hint = f"(max-width: {width}px) 100vw, {width}px"
+    return format_html(
+        "<picture>"
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        "</picture>",
+        images.srcset(image.name, sizes, webp=True),
+        hint,
+        src,
+        images.srcset(image.name, sizes),
+        hint,
+        flatatt(attrs),
+    )
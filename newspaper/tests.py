@@ -1,3 +1,1157 @@
-from django.test import TestCase
+from datetime import timedelta
+from base64 import urlsafe_b64encode
+from io import BytesIO, StringIO
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+import uuid
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from newspaper import (
+    comment_queue,
+    conditional,
+    images,
+    newsletter,
+    page_cache,
+    related,
+    search,
+    view_counter,
+)
+from newspaper.home_cache import (
+    bump_content_generation,
+    content_generation,
+    warm_home_cache,
+)
+from newspaper.models import Category, Comment, NewsLetter, Post, RelatedPost, Tag
+from newspaper.navigation_context_processor import get_navigation, navigation_version
+from newspaper.page_cache import HIT_HEADER, AnonymousPageCacheMiddleware
+
+
+def make_post(title="post", **fields):
+    """A published post, with a new author and category unless given."""
+    if "author" not in fields:
+        fields["author"], _ = User.objects.get_or_create(username="editor")
+    if "category" not in fields:
+        fields["category"], _ = Category.objects.get_or_create(name="politics")
+    fields.setdefault("status", "published")
+    fields.setdefault("published_at", timezone.now())
+    return Post.objects.create(
+        title=title,
+        content=fields.pop("content", "<p>content</p>"),
+        featured_image=fields.pop("featured_image", "post_images/test.jpg"),
+        **fields,
+    )
+
+
+class HomeViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="editor")
+
+    def create_category_with_posts(self, name, count):
+        category = Category.objects.create(name=name)
+        for i in range(count):
+            make_post(f"{name} {i}", category=category, views_count=i)
+        return category
+
+    def count_home_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_whats_new_shows_latest_posts_per_category(self):
+        category = self.create_category_with_posts("politics", 6)
+        response = self.client.get(reverse("home"))
+        [(tab_category, posts)] = response.context["whats_new"]
+        self.assertEqual(tab_category, category)
+        self.assertEqual(
+            [post.title for post in posts],
+            ["politics 5", "politics 4", "politics 3", "politics 2"],
+        )
+
+    def test_warmed_sections_are_served_from_the_cache(self):
+        self.create_category_with_posts("politics", 3)
+        cold = self.count_home_queries()
+
+        cache.clear()
+        warm_home_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home"))
+        self.assertLess(len(queries), cold)
+        self.assertContains(response, "politics 2")
+
+    def test_content_changes_warm_the_sections_after_commit(self):
+        self.create_category_with_posts("politics", 3)
+        cold = self.count_home_queries()
+
+        cache.clear()
+        generation = content_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_content_generation()
+        self.assertNotEqual(content_generation(), generation)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("home"))
+        self.assertLess(len(queries), cold)
+
+    def test_warm_command_needs_a_shared_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("warm_home_cache")
+
+    def test_query_count_does_not_grow_with_categories(self):
+        self.create_category_with_posts("politics", 5)
+        self.create_category_with_posts("sports", 5)
+        baseline = self.count_home_queries()
+
+        for name in ("economy", "world", "tech", "health"):
+            self.create_category_with_posts(name, 5)
+        self.assertEqual(self.count_home_queries(), baseline)
+
+
+class PostDetailViewTests(TestCase):
+    # post, its tags, its comments, the adjacent posts, the related posts and
+    # the conditional GET validators; the sidebars come from the cache
+    QUERY_BUDGET = 6
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="editor")
+        self.category = Category.objects.create(name="politics")
+        now = timezone.now()
+        # published out of id order: navigation follows publication order
+        self.posts = [
+            self.create_post("second", now - timedelta(days=2)),
+            self.create_post("first", now - timedelta(days=3)),
+            self.create_post("third", now - timedelta(days=1)),
+        ]
+
+    def create_post(self, title, published_at):
+        return make_post(title, category=self.category, published_at=published_at)
+
+    def get_detail(self, post):
+        # the page cache would answer without running the view
+        cache.clear()
+        get_navigation()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-detail", args=[post.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_previous_and_next_post_follow_publication_order(self):
+        second, first, third = self.posts
+        response, _ = self.get_detail(second)
+        self.assertEqual(response.context["previous_post"], first)
+        self.assertEqual(response.context["next_post"], third)
+
+        response, _ = self.get_detail(first)
+        self.assertIsNone(response.context["previous_post"])
+        self.assertEqual(response.context["next_post"], second)
+
+    def test_query_budget(self):
+        post = self.posts[0]
+        _, queries = self.get_detail(post)
+        self.assertLessEqual(queries, self.QUERY_BUDGET)
+
+        for i in range(5):
+            tag = Tag.objects.create(name=f"tag {i}")
+            post.tag.add(tag)
+            Comment.objects.create(
+                post=post, name="reader", email="reader@example.com", message="hi"
+            )
+            self.create_post(f"more {i}", timezone.now())
+        self.assertEqual(self.get_detail(post)[1], queries)
+
+    def test_first_page_of_comments(self):
+        post = self.posts[0]
+        comments = [
+            Comment.objects.create(
+                post=post, name="reader", email="reader@example.com", message=str(i)
+            )
+            for i in range(25)
+        ]
+        comments[0].delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 24)
+
+        response, _ = self.get_detail(post)
+        self.assertEqual(len(response.context["comments"]), 20)
+        self.assertEqual(response.context["comments"][0], comments[-1])
+        next_page = self.client.get(response.context["comments_next"]).json()
+        self.assertEqual(len(next_page["results"]), 4)
+        self.assertIsNone(next_page["next"])
+
+    @override_settings(
+        COMMENT_QUEUE_BACKEND="memory", COMMENT_QUEUE_WORKER_THREAD=False
+    )
+    def test_queued_comment_is_shown_to_its_author(self):
+        post = self.posts[0]
+        response = self.client.post(
+            reverse("comment"),
+            {
+                "post": post.pk,
+                "name": "reader",
+                "email": "r@example.com",
+                "message": "hi",
+            },
+        )
+        self.assertRedirects(response, reverse("post-detail", args=[post.pk]))
+        self.assertFalse(Comment.objects.exists())
+
+        response, _ = self.get_detail(post)
+        [pending] = response.context["pending_comments"]
+        self.assertEqual(pending.message, "hi")
+
+        self.assertEqual(comment_queue.drain(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        response, _ = self.get_detail(post)
+        self.assertEqual(response.context["pending_comments"], [])
+        self.assertEqual(response.context["comments"][0].message, "hi")
+
+
+class RefusingEmailBackend(EmailBackend):
+    """Refuses the addresses starting with "b"."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith("b"):
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b"no")})
+        return super().send_messages(messages)
+
+
+class NewsletterTests(TestCase):
+    def setUp(self):
+        make_post("election", published_at=timezone.now() - timedelta(hours=1))
+        for email in ["a@example.com", "b@example.com"]:
+            NewsLetter.objects.create(email=email)
+
+    def test_issue_is_sent_once_to_every_address(self):
+        issue = newsletter.create_issue()
+        self.assertEqual(issue.deliveries.count(), 2)
+
+        self.assertEqual(newsletter.send(issue, batch_size=1), (2, 0))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["a@example.com", "b@example.com"],
+        )
+        html, _ = mail.outbox[0].alternatives[0]
+        self.assertIn("election", html)
+
+        self.assertEqual(newsletter.send(issue), (0, 0))
+        issue.refresh_from_db()
+        self.assertIsNotNone(issue.sent_at)
+        self.assertIsNone(newsletter.create_issue())
+
+    def test_failed_deliveries_are_retried_by_the_next_run(self):
+        issue = newsletter.create_issue()
+        with self.settings(EMAIL_BACKEND="newspaper.tests.RefusingEmailBackend"):
+            self.assertEqual(newsletter.send(issue), (1, 1))
+        failed = issue.deliveries.get(status="failed")
+        self.assertEqual((failed.email, failed.attempts), ("b@example.com", 1))
+
+        self.assertEqual(newsletter.send(issue), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(newsletter.unsent(issue).exists())
+
+
+class NewsLetterSignupTests(TestCase):
+    def test_subscribing_again_is_not_an_error(self):
+        for email in ["reader@example.com", " Reader@Example.com"]:
+            response = self.client.post(
+                reverse("newsletter"),
+                {"email": email},
+                HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+            )
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            "/api/v1/newsletter/", {"email": "READER@example.com"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(NewsLetter.objects.values_list("email", flat=True)),
+            ["reader@example.com"],
+        )
+
+    def test_import_skips_subscribed_repeated_and_invalid_addresses(self):
+        NewsLetter.objects.create(email="a@example.com")
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("name,email\nA,A@example.com\nB,b@example.com\n")
+            file.write("B,b@example.com\nC,not an address\nD,d@example.com\n")
+            file.flush()
+            call_command(
+                "import_subscribers", file.name, batch_size=2, stdout=StringIO()
+            )
+        self.assertEqual(
+            sorted(NewsLetter.objects.values_list("email", flat=True)),
+            ["a@example.com", "b@example.com", "d@example.com"],
+        )
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=300)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # as if flushed just now: increments stay in the buffer
+        cache.add(view_counter.FLUSHED_KEY, 1)
+        self.post = make_post()
+
+    def views_count(self):
+        self.post.refresh_from_db()
+        return self.post.views_count
+
+    def test_increments_are_buffered_until_flushed(self):
+        for _ in range(3):
+            view_counter.increment(self.post.pk)
+        self.assertEqual(view_counter.pending(self.post.pk), 3)
+        self.assertEqual(self.views_count(), 0)
+
+        self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(view_counter.pending(self.post.pk), 0)
+        self.assertEqual(self.views_count(), 3)
+        self.assertEqual(view_counter.flush(), 0)
+
+    def test_increment_flushes_once_per_interval(self):
+        cache.delete(view_counter.FLUSHED_KEY)
+        view_counter.increment(self.post.pk)
+        view_counter.increment(self.post.pk)
+        self.assertEqual(self.views_count(), 1)
+        self.assertEqual(view_counter.pending(self.post.pk), 1)
+
+    def test_no_increment_is_lost_across_a_flush(self):
+        view_counter.increment(self.post.pk)
+        get_many = cache.get_many
+
+        def get_many_then_view(keys):
+            counts = get_many(keys)
+            view_counter.increment(self.post.pk)  # arrives during the flush
+            return counts
+
+        with mock.patch.object(cache, "get_many", get_many_then_view):
+            self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(view_counter.pending(self.post.pk), 1)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(self.views_count(), 2)
+
+    def test_flush_command_needs_a_shared_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("flush_view_counts")
+
+
+class SearchTests(TestCase):
+    """Runs against the backend of the test database (FTS5 or tsvector)."""
+
+    def setUp(self):
+        self.body_match = make_post("weather", content="<p>the election is near</p>")
+        self.title_match = make_post("election results", content="<p>counted</p>")
+        make_post("sports", content="<p>football</p>")
+
+    def search(self, query):
+        return [post.title for post in search.get_backend().search(query)[:10]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("election"), ["election results", "weather"])
+        [post] = search.get_backend().search("football")[:10]
+        self.assertIn("<mark>", post.snippet)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.body_match.title = "referendum"
+        self.body_match.save()
+        self.assertEqual(self.search("referendum"), ["referendum"])
+
+        self.body_match.status = "unpublished"
+        self.body_match.save()
+        self.assertEqual(self.search("referendum"), [])
+
+        self.title_match.delete()
+        self.assertEqual(self.search("election"), [])
+
+    def test_empty_or_missing_query_finds_nothing(self):
+        self.assertEqual(search.get_backend().search("  ").count(), 0)
+        for url in [reverse("post-search"), reverse("post-search") + "?query="]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["page_obj"].object_list), 0)
+
+
+class NavigationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = make_post()
+
+    def test_navigation_is_cached_until_a_category_or_tag_changes(self):
+        with self.assertNumQueries(4):
+            get_navigation()
+        with self.assertNumQueries(0):
+            navigation = get_navigation()
+        self.assertEqual([c.name for c in navigation["categories"]], ["politics"])
+
+        Category.objects.create(name="sports")
+        with self.assertNumQueries(4):
+            navigation = get_navigation()
+        self.assertEqual(len(navigation["categories"]), 2)
+
+        tag = Tag.objects.create(name="vote")
+        with self.assertNumQueries(4):
+            self.assertEqual(get_navigation()["tags"], [tag])
+        with self.assertNumQueries(0):
+            get_navigation()
+
+        self.post.category.name = "world"
+        self.post.category.save()
+        navigation = get_navigation()
+        self.assertIn("world", [c.name for c in navigation["categories"]])
+
+    def test_misses_log_the_counters_of_the_process(self):
+        get_navigation()
+        get_navigation()
+        cache.delete(f"navigation:{navigation_version()}")
+        with self.assertLogs("newspaper.navigation_context_processor") as logs:
+            get_navigation()
+        self.assertIn("1 hits, 2 misses", logs.output[0])
+
+    def test_stats_command_needs_a_shared_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("navigation_cache_stats")
+
+        get_navigation()
+        get_navigation()
+        out = StringIO()
+        with mock.patch("newspaper.shared_cache.is_shared", return_value=True):
+            call_command("navigation_cache_stats", stdout=out)
+        self.assertIn("hits: 1\nmisses: 1\nhit ratio: 50.0%", out.getvalue())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        # published in ties of three, across page ends: only the id breaks them
+        self.posts = [
+            make_post(f"post {i}", published_at=now - timedelta(hours=i // 3))
+            for i in range(25)
+        ]
+        self.newest_first = sorted(
+            self.posts, key=lambda post: (post.published_at, post.pk), reverse=True
+        )
+
+    def get_page(self, cursor=None):
+        url = reverse("post-list") + (f"?cursor={cursor}" if cursor else "")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def test_pages_follow_publication_then_id_order(self):
+        pages = [self.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([post for page in pages for post in page], self.newest_first)
+        self.assertFalse(pages[0].has_previous())
+        self.assertIsNone(pages[-1].next_cursor)
+
+        previous = self.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        first = self.get_page(previous.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        def encode(position):
+            return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+        for cursor in [
+            "not-a-cursor",
+            encode(["yesterday", 1, False]),
+            encode([timezone.now().isoformat(), "1", False]),
+            encode([timezone.now().isoformat(), 2**70, False]),
+            encode({"published_at": 1}),
+        ]:
+            response = self.client.get(reverse("post-list") + f"?cursor={cursor}")
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class ExplainQueriesTests(TestCase):
+    def explain(self, *args):
+        out = StringIO()
+        call_command("explain_queries", *args, stdout=out)
+        return out.getvalue()
+
+    def test_post_and_tag_queries_are_skipped_without_data(self):
+        output = self.explain()
+        self.assertIn("SKIPPED   latest comments (no published post", output)
+        self.assertIn("SKIPPED   post list by tag (no tag", output)
+
+    def test_explains_with_a_post_and_tag_of_the_database(self):
+        post = make_post()
+        tag = Tag.objects.create(name="vote")
+        post.tag.add(tag)
+        output = self.explain("--post", str(post.pk), "--strict")
+        self.assertNotIn("SKIPPED", output)
+        self.assertNotIn("NO INDEX", output)
+        with self.assertRaises(CommandError):
+            self.explain("--tag", str(tag.pk + 1))
+
+
+class ExportStaticSiteTests(TestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            "export_static_site",
+            self.output,
+            "--workers=1",
+            "--skip-assets",
+            *args,
+            stdout=out,
+            stderr=err,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_exports_every_published_post(self):
+        posts = [make_post(f"post {i}") for i in range(3)]
+        make_post("draft", status="unpublished", published_at=None)
+        out, err = self.export()
+        self.assertEqual(err, "")
+        self.assertIn("(0 failed)", out)
+        for post in posts:
+            path = reverse("post-detail", args=[post.pk]).strip("/")
+            with open(os.path.join(self.output, path, "index.html")) as f:
+                self.assertIn(post.title, f.read())
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.output, "post-detail"))), len(posts)
+        )
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class PostImageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def open_image(self, name):
+        with default_storage.open(name) as f:
+            image = Image.open(f)
+            image.load()
+        return image
+
+    def test_upload_generates_derivatives_in_both_formats(self):
+        post = make_post(featured_image=SimpleUploadedFile("pic.png", png(900, 600)))
+        post.refresh_from_db()
+        name = post.featured_image.name
+        # no "hero": images are never upscaled
+        self.assertEqual(
+            post.featured_image_sizes, {"thumb": 160, "card": 480, "original": 900}
+        )
+        for size, dimensions in [("thumb", (160, 107)), ("card", (480, 320))]:
+            image = self.open_image(images.derivative_name(name, size))
+            self.assertEqual((image.format, image.size), ("PNG", dimensions))
+            webp = self.open_image(images.derivative_name(name, size, "webp"))
+            self.assertEqual((webp.format, webp.size), ("WEBP", dimensions))
+        original = self.open_image(images.derivative_name(name, "original", "webp"))
+        self.assertEqual((original.format, original.width), ("WEBP", 900))
+        self.assertFalse(
+            default_storage.exists(images.derivative_name(name, "hero", "webp"))
+        )
+
+    def test_unreadable_upload_clears_the_sizes(self):
+        post = make_post(featured_image=SimpleUploadedFile("pic.png", png(900, 600)))
+        post.featured_image = SimpleUploadedFile("broken.png", b"not an image")
+        with self.assertLogs("newspaper.signals", "ERROR"):
+            post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_sizes, {})
+
+    def optimize_media(self):
+        out = StringIO()
+        call_command("optimize_media", "post_images", "--workers=1", stdout=out)
+        return out.getvalue()
+
+    def test_optimize_media_resizes_re_encoded_featured_images(self):
+        buffer = BytesIO()
+        Image.effect_noise((400, 300), 60).convert("RGB").save(
+            buffer, "JPEG", quality=100
+        )
+        post = make_post(
+            featured_image=SimpleUploadedFile("pic.jpg", buffer.getvalue())
+        )
+        name = post.featured_image.name
+        Post.objects.filter(pk=post.pk).update(featured_image_sizes={})
+
+        output = self.optimize_media()
+        self.assertIn("1 images to optimize", output)
+        self.assertIn("image of 1 posts again", output)
+        self.assertLess(default_storage.size(name), len(buffer.getvalue()))
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_sizes, {"thumb": 160, "original": 400})
+
+        # unchanged files are skipped without reading them
+        with mock.patch(
+            "newspaper.management.commands.optimize_media.file_hash"
+        ) as file_hash:
+            self.assertIn("0 images to optimize", self.optimize_media())
+        file_hash.assert_not_called()
+
+        path = default_storage.path(name)
+        os.utime(path, ns=(0, 0))  # touched, same content
+        self.assertIn("0 images to optimize", self.optimize_media())
+        with open(path, "ab") as f:
+            f.write(b"\0")
+        self.assertIn("1 images to optimize", self.optimize_media())
+
+    def render(self, post, size):
+        template = Template(
+            '{% load post_images %}{% post_image post size class="x" %}'
+        )
+        return template.render(Context({"post": post, "size": size}))
+
+    def test_post_image_tag(self):
+        post = make_post(featured_image=SimpleUploadedFile("pic.png", png(900, 600)))
+        post.refresh_from_db()
+        root = post.featured_image.url[: -len(".png")]
+
+        html = self.render(post, "card")
+        self.assertIn(
+            f'<source type="image/webp" srcset="{root}.thumb.webp 160w, '
+            f'{root}.card.webp 480w, {root}.original.webp 900w"',
+            html,
+        )
+        self.assertIn(
+            f'<img src="{root}.card.png" srcset="{root}.thumb.png 160w, ', html
+        )
+        self.assertIn(f"{root}.png 900w", html)
+        self.assertIn('class="x"', html)
+
+        # no hero derivative: the original is the fallback
+        self.assertIn(f'<img src="{root}.png"', self.render(post, "hero"))
+
+        post.featured_image_sizes = {}
+        html = self.render(post, "card")
+        self.assertNotIn("<picture>", html)
+        self.assertIn(f'<img src="{root}.png"', html)
+
+    def test_backfill_command_resizes_images_without_derivatives(self):
+        name = default_storage.save("post_images/old.png", BytesIO(png(600, 300)))
+        post = make_post(featured_image=name)
+        self.assertEqual(post.featured_image_sizes, {})
+
+        out = StringIO()
+        call_command("generate_image_derivatives", workers=1, stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(
+            post.featured_image_sizes, {"thumb": 160, "card": 480, "original": 600}
+        )
+        self.assertTrue(default_storage.exists(images.derivative_name(name, "card")))
+        self.assertIn("Resized 1 images, 0 failed.", out.getvalue())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = make_post()
+
+    def list_etag(self):
+        # a new request: validators are memoized per request
+        return conditional.post_list_etag(
+            SimpleNamespace(get_full_path=lambda: "/", user=SimpleNamespace(pk=None))
+        )
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for header, value in [
+            ("HTTP_IF_NONE_MATCH", response["ETag"]),
+            ("HTTP_IF_MODIFIED_SINCE", response["Last-Modified"]),
+        ]:
+            self.assertEqual(self.client.get(url, **{header: value}).status_code, 304)
+
+    def test_list_and_detail_answer_304_to_matching_validators(self):
+        urls = [reverse("post-list"), reverse("post-detail", args=[self.post.pk])]
+        for url in urls:  # anonymous, from the page cache
+            self.assert_revalidates(url)
+        # logged in, from the views' own validators
+        self.client.force_login(self.post.author)
+        for url in urls:
+            self.assert_revalidates(url)
+
+    def test_list_validator_follows_post_and_comment_changes(self):
+        tag = Tag.objects.create(name="vote")
+        second = make_post("second")
+        changes = [
+            lambda: self.post.save(),
+            lambda: self.post.tag.add(tag),
+            lambda: Comment.objects.create(
+                post=self.post, name="reader", email="r@example.com", message="hi"
+            ),
+            lambda: Comment.objects.get().delete(),
+            lambda: second.delete(),
+            lambda: comment_queue.write(
+                [
+                    {
+                        "post_id": self.post.pk,
+                        "name": "reader",
+                        "email": "r@example.com",
+                        "message": "queued",
+                    }
+                ]
+            ),
+        ]
+        etags = [self.list_etag()]
+        for change in changes:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            etags.append(self.list_etag())
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_list_validator_runs_no_query(self):
+        with self.assertNumQueries(0):
+            self.list_etag()
+
+
+@override_settings(PAGE_CACHE_PER_PROCESS=True)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = make_post()
+        self.url = reverse("post-detail", args=[self.post.pk])
+
+    def assert_cached(self, url):
+        self.assertEqual(self.client.get(url)[HIT_HEADER], "miss")
+        self.assertEqual(self.client.get(url)[HIT_HEADER], "hit")
+
+    def assert_not_cached(self, url):
+        for _ in range(2):
+            self.assertNotIn(HIT_HEADER, self.client.get(url))
+
+    def serve(self, view):
+        """Serve the home page through the middleware with ``view``."""
+        request = RequestFactory().get(reverse("home"))
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        return AnonymousPageCacheMiddleware(view)(request)
+
+    def test_anonymous_pages_are_cached(self):
+        self.assert_cached(self.url)
+        self.assert_cached(reverse("home"))
+
+    def test_authenticated_users_bypass_the_cache(self):
+        self.client.force_login(User.objects.create_user(username="reader"))
+        self.assert_not_cached(self.url)
+
+    def test_sessions_with_data_bypass_the_cache(self):
+        session = self.client.session
+        session["seen"] = True
+        session.save()
+        self.assert_not_cached(self.url)
+
+    def test_errors_are_not_cached(self):
+        self.assert_not_cached(reverse("post-detail", args=[self.post.pk + 1]))
+
+    def test_responses_setting_cookies_are_not_cached(self):
+        def view(request):
+            response = HttpResponse("page")
+            response.set_cookie("theme", "dark")
+            return response
+
+        self.serve(view)
+        self.assertNotIn(HIT_HEADER, self.serve(view))
+
+    def test_pages_using_the_csrf_token_are_not_cached(self):
+        def view(request):
+            get_token(request)
+            return HttpResponse("page")
+
+        self.serve(view)
+        self.assertNotIn(HIT_HEADER, self.serve(view))
+        # the token the middleware adds itself to every page does not count
+        self.serve(lambda request: HttpResponse("page"))
+        self.assertEqual(
+            self.serve(lambda request: HttpResponse("page"))[HIT_HEADER], "hit"
+        )
+
+    def test_saving_the_post_purges_its_pages(self):
+        self.assert_cached(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "updated"
+            self.post.save()
+        self.assertContains(self.client.get(self.url), "updated")
+        self.assertEqual(self.client.get(self.url)[HIT_HEADER], "hit")
+
+    def test_comments_purge_the_post_page(self):
+        self.assert_cached(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, name="reader", email="r@example.com", message="hi"
+            )
+        self.assertEqual(self.client.get(self.url)[HIT_HEADER], "miss")
+
+    @override_settings(PAGE_CACHE_PER_PROCESS=False)
+    def test_disabled_on_a_cache_local_to_each_process(self):
+        self.assert_not_cached(self.url)
+        [warning] = page_cache.check_page_cache(None)
+        self.assertEqual(warning.id, "newspaper.W001")
+        with mock.patch("newspaper.shared_cache.is_shared", return_value=True):
+            self.assertEqual(page_cache.check_page_cache(None), [])
+            self.client = self.client_class()  # loads the middlewares again
+            self.assert_cached(self.url)
+
+
+class PostViewCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # as if flushed just now: views stay in the buffer
+        cache.add(view_counter.FLUSHED_KEY, 1)
+        self.post = make_post()
+
+    def beacon(self, post, address="10.0.0.1"):
+        return self.client.post(
+            reverse("post-view-count", args=[post.pk]), REMOTE_ADDR=address
+        )
+
+    def test_counts_a_view_of_a_published_post(self):
+        self.assertEqual(self.beacon(self.post).status_code, 204)
+        self.assertEqual(view_counter.pending(self.post.pk), 1)
+
+    def test_counts_a_reader_once_per_window(self):
+        self.beacon(self.post)
+        self.assertEqual(self.beacon(self.post).status_code, 204)
+        self.assertEqual(view_counter.pending(self.post.pk), 1)
+        self.beacon(self.post, address="10.0.0.2")
+        self.assertEqual(view_counter.pending(self.post.pk), 2)
+
+    def test_unpublished_and_missing_posts_are_not_counted(self):
+        draft = make_post(status="unpublished", published_at=None)
+        self.assertEqual(self.beacon(draft).status_code, 404)
+        self.assertEqual(view_counter.pending(draft.pk), 0)
+        self.assertEqual(
+            self.client.post(
+                reverse("post-view-count", args=[draft.pk + 1])
+            ).status_code,
+            404,
+        )
+
+
+class ContentTests(TestCase):
+    def content_html(self, html):
+        return make_post(content=html).content_html
+
+    def test_scripts_are_dropped_with_their_code(self):
+        html = self.content_html("<p>before<script>alert(1)</script>after</p>")
+        self.assertEqual(html, "<p>beforeafter</p>")
+
+    def test_event_handlers_are_stripped(self):
+        html = self.content_html(
+            '<p onclick="steal()">text</p><img src="/a.png" onerror="steal()">'
+        )
+        self.assertNotIn("onclick", html)
+        self.assertNotIn("onerror", html)
+        self.assertIn('src="/a.png"', html)
+
+    def test_javascript_urls_are_stripped(self):
+        html = self.content_html('<a href="javascript:steal()">link</a>')
+        self.assertEqual(html, "<a>link</a>")
+
+    def test_disallowed_tags_are_stripped_but_their_text_kept(self):
+        html = self.content_html(
+            '<form action="/x"><input name="q"><p>kept</p></form>'
+            "<style>p { color: red }</style><object>embed</object>"
+        )
+        self.assertEqual(html, "<p>kept</p>embed")
+
+    def test_formatting_survives(self):
+        source = (
+            '<h2>Title</h2><p><b>bold</b> <em>em</em> <a href="https://example.com"'
+            ' title="t">link</a></p><ul><li>item</li></ul><blockquote>quote'
+            '</blockquote><table><tbody><tr><td colspan="2">cell</td></tr>'
+            "</tbody></table>"
+        )
+        self.assertEqual(self.content_html(source), source)
+
+    def test_images_and_embeds_load_lazily(self):
+        html = self.content_html(
+            '<img src="/a.png" alt="a"><iframe src="https://example.com/v"></iframe>'
+        )
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('decoding="async"', html)
+        self.assertEqual(html.count('loading="lazy"'), 2)
+
+    def test_derived_text_fields(self):
+        post = make_post(content="<p>one two</p><p>three</p>" + "<p>word</p>" * 200)
+        self.assertEqual(post.content_text[:13], "one two three")
+        self.assertEqual(post.word_count, 203)
+        self.assertEqual(post.reading_time, 2)
+        self.assertTrue(post.excerpt.startswith("one two three word"))
+
+
+class PostSaveTests(TestCase):
+    def test_save_does_not_overwrite_the_counters(self):
+        post = make_post()
+        Post.objects.filter(pk=post.pk).update(views_count=10, comment_count=2)
+        post.title = "updated"
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.title, "updated")
+        self.assertEqual((post.views_count, post.comment_count), (10, 2))
+
+
+class ReconcileCommentCountsTests(TestCase):
+    def setUp(self):
+        self.posts = [make_post(f"post {i}") for i in range(3)]
+        for post in self.posts[:2]:
+            Comment.objects.create(
+                post=post, name="reader", email="r@example.com", message="hi"
+            )
+        # drifted, e.g. comments deleted with raw SQL
+        Post.objects.filter(pk=self.posts[0].pk).update(comment_count=5)
+        Post.objects.filter(pk=self.posts[2].pk).update(comment_count=2)
+
+    def counts(self):
+        return list(Post.objects.order_by("pk").values_list("comment_count", flat=True))
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_comment_counts", "--batch-size=2", *args, stdout=out)
+        return out.getvalue()
+
+    def test_wrong_counts_are_repaired(self):
+        version = conditional.list_version()
+        output = self.reconcile()
+        self.assertIn("Repaired 2 wrong counts in 3 posts.", output)
+        self.assertEqual(self.counts(), [1, 1, 0])
+        self.assertNotEqual(conditional.list_version(), version)
+        self.assertIn("Repaired 0 wrong counts", self.reconcile())
+
+    def test_dry_run_only_reports(self):
+        output = self.reconcile("--dry-run")
+        self.assertIn(f"post {self.posts[0].pk}: 5 -> 1", output)
+        self.assertIn(f"post {self.posts[2].pk}: 2 -> 0", output)
+        self.assertIn("Found 2 wrong counts in 3 posts.", output)
+        self.assertEqual(self.counts(), [5, 1, 2])
+
+
+@override_settings(RELATED_POSTS_COUNT=2)
+class RelatedPostsRefreshTests(TestCase):
+    """
+    ``related.refresh()`` merges a change into the precomputed lists; the
+    result must be what ``related.rebuild()`` computes from scratch.
+    """
+
+    def setUp(self):
+        self.tags = [Tag.objects.create(name=f"tag {i}") for i in range(3)]
+        sport = Category.objects.create(name="sport")
+        # a-b and a-c share a tag and the category (1.5), b-c the category (0.5)
+        self.a = self.create_post("a", tags=[0, 1])
+        self.b = self.create_post("b", tags=[0])
+        self.c = self.create_post("c", tags=[1])
+        self.d = self.create_post("d", tags=[2], category=sport)
+        related.rebuild()
+
+    def create_post(self, title, tags, **fields):
+        post = make_post(title, **fields)
+        post.tag.set([self.tags[i] for i in tags])
+        return post
+
+    def lists(self):
+        """``{title: [related titles]}`` of the posts having related posts."""
+        return {
+            post.title: [other.title for other in related.related_posts(post)]
+            for post in Post.objects.filter(related_entries__isnull=False).distinct()
+        }
+
+    def assert_lists(self, expected):
+        self.assertEqual(self.lists(), expected)
+        entries = set(RelatedPost.objects.values_list("post", "related", "score"))
+        self.assertEqual(RelatedPost.objects.count(), len(entries))
+        related.rebuild()
+        self.assertEqual(
+            set(RelatedPost.objects.values_list("post", "related", "score")), entries
+        )
+
+    def test_precomputed_lists(self):
+        # ties go to the newer post
+        self.assert_lists({"a": ["c", "b"], "b": ["a", "c"], "c": ["a", "b"]})
+
+    def test_new_post_enters_the_lists_evicting_the_lowest_score(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post("e", tags=[0, 1])
+        self.assert_lists(
+            {"a": ["e", "c"], "b": ["e", "a"], "c": ["e", "a"], "e": ["a", "c"]}
+        )
+
+    def test_retagging_replaces_an_existing_pair(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.b.tag.add(self.tags[1])
+        self.assertEqual(
+            RelatedPost.objects.get(post=self.a, related=self.b).score, 2.5
+        )
+        self.assert_lists({"a": ["b", "c"], "b": ["a", "c"], "c": ["b", "a"]})
+
+    def test_lower_scores_recompute_the_lists_left(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a.tag.clear()
+        self.assert_lists({"a": ["c", "b"], "b": ["c", "a"], "c": ["b", "a"]})
+
+    def test_moving_to_another_category(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.d.category = self.a.category
+            self.d.save()
+        self.assert_lists(
+            {"a": ["c", "b"], "b": ["a", "d"], "c": ["a", "d"], "d": ["c", "b"]}
+        )
+
+    def test_unpublished_posts_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a.status = "unpublished"
+            self.a.save()
+        self.assert_lists({"b": ["c"], "c": ["b"]})
+
+    def test_deleted_posts_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a.delete()
+        self.assert_lists({"b": ["c"], "c": ["b"]})
+
+    def test_post_deleted_in_the_transaction_saving_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post("e", tags=[0]).delete()
+        self.assert_lists({"a": ["c", "b"], "b": ["a", "c"], "c": ["a", "b"]})
+
+
+@override_settings(COMMENT_QUEUE_BACKEND="memory")
+class CommentQueueTests(TestCase):
+    def setUp(self):
+        self.post = make_post()
+        self.queue = comment_queue.MemoryQueue()
+
+    def put(self, message="hi", **fields):
+        payload = {
+            "post_id": self.post.pk,
+            "name": "reader",
+            "email": "r@example.com",
+            "message": message,
+            "token": str(uuid.uuid4()),
+        }
+        payload.update(fields)
+        return self.queue.put(payload)
+
+    def comment_count(self):
+        self.post.refresh_from_db()
+        return self.post.comment_count
+
+    def test_batch_written_with_the_counts(self):
+        for i in range(3):
+            self.put(str(i))
+        self.assertEqual(comment_queue.drain(queue=self.queue), 3)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertEqual(self.comment_count(), 3)
+
+    def test_redelivered_batch_is_written_once(self):
+        first = self.put("first")
+        # the worker dies after writing, before removing the batch
+        with mock.patch.object(self.queue, "done"):
+            self.assertEqual(comment_queue.drain(queue=self.queue), 1)
+        self.queue.release([first])
+        self.put("second")
+
+        self.assertEqual(comment_queue.drain(queue=self.queue), 2)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(
+            sorted(Comment.objects.values_list("message", flat=True)),
+            ["first", "second"],
+        )
+        self.assertEqual(self.comment_count(), 2)
+
+    def test_comments_written_meanwhile_by_another_worker_are_not_counted(self):
+        first = self.put("first")
+        self.put("second")
+        batch = self.queue.take(10)
+        # another worker, its lease ran out, wrote the first one since
+        comment_queue.write(p for item_id, p in batch if item_id == first)
+        with mock.patch.object(comment_queue, "written_tokens", return_value=set()):
+            self.assertEqual(comment_queue.write(p for _, p in batch), 1)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(self.comment_count(), 2)
+
+    @override_settings(
+        COMMENT_QUEUE_BACKEND="memory", COMMENT_QUEUE_WORKER_THREAD=False
+    )
+    def test_author_purges_the_post_once_its_comment_is_written(self):
+        self.client.post(
+            reverse("comment"),
+            {
+                "post": self.post.pk,
+                "name": "reader",
+                "email": "r@example.com",
+                "message": "hi",
+            },
+        )
+        # the worker's purge, in its own process, missed this cache
+        with mock.patch.object(comment_queue, "purge"):
+            self.assertEqual(comment_queue.drain(), 1)
+        with mock.patch.object(page_cache, "purge") as purge:
+            response = self.client.get(reverse("post-detail", args=[self.post.pk]))
+        self.assertEqual(response.context["pending_comments"], [])
+        self.assertEqual(list(purge.call_args.args[0]), [f"post:{self.post.pk}"])
+
+    def test_comments_of_deleted_posts_are_dropped(self):
+        self.put()
+        self.put(post_id=self.post.pk + 1)
+        self.assertEqual(comment_queue.write(p for _, p in self.queue.take(10)), 1)
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_comments_queued_without_a_token_are_written(self):
+        self.put(token=None)
+        self.assertEqual(comment_queue.drain(queue=self.queue), 1)
+        self.assertIsNotNone(Comment.objects.get().queue_token)
+
+    def test_no_worker_thread_by_default(self):
+        queued = len(comment_queue.get_queue())
+        response = self.client.post(
+            reverse("comment"),
+            {
+                "post": self.post.pk,
+                "name": "reader",
+                "email": "r@example.com",
+                "message": "hi",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(comment_queue.get_queue()), queued + 1)
+        self.assertFalse(
+            any(thread.name == "comment-queue" for thread in threading.enumerate())
+        )
+        self.assertEqual(comment_queue.drain(), 1)
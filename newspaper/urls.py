@@ -12,6 +12,11 @@ urlpatterns = [
         views.PostDetailView.as_view(),
         name="post-detail",
     ),
+    path(
+        "post-detail/<int:pk>/views/",
+        views.PostViewCountView.as_view(),
+        name="post-view-count",
+    ),
     path(
         "post-list",
         views.PostListView.as_view(),
@@ -0,0 +1,157 @@
+"""
+Buffered, write-behind counter for ``Post.views_count``.
+
+A page view only increments a per-post counter in the cache. The pending
+deltas are written back periodically as batched
+``UPDATE ... SET views_count = views_count + n`` statements, so reading an
+article never rewrites the whole ``Post`` row. Every write sends
+``views_flushed``, from which the report app keeps the views per hour.
+
+``count_view()`` counts a reader at most once per post and
+``VIEW_COUNT_DEDUPE_WINDOW``, so replaying the beacon does not inflate the
+counts.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from newspaper import shared_cache
+from newspaper.models import Post
+
+KEY_PREFIX = "view-count"
+DIRTY_KEY = f"{KEY_PREFIX}:dirty"
+LOCK_KEY = f"{KEY_PREFIX}:lock"
+FLUSHED_KEY = f"{KEY_PREFIX}:flushed"
+
+# sent in the transaction writing the views, with views={post id: new views}
+views_flushed = Signal()
+
+
+def _cache():
+    return caches[settings.VIEW_COUNT_CACHE]
+
+
+def is_shared():
+    """
+    Whether every process sees the same buffer. With a per-process cache
+    each web process only flushes its own views, on its requests.
+    """
+    return shared_cache.is_shared(_cache())
+
+
+def _key(post_id):
+    return f"{KEY_PREFIX}:{post_id}"
+
+
+@contextmanager
+def _dirty_lock(cache):
+    # the dirty set is only touched the first time a post is viewed after a
+    # flush, so a simple spin lock on cache.add() is enough here.
+    while not cache.add(LOCK_KEY, 1, timeout=5):
+        time.sleep(0.001)
+    try:
+        yield
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def _mark_dirty(cache, post_ids):
+    with _dirty_lock(cache):
+        dirty = cache.get(DIRTY_KEY, set())
+        dirty.update(post_ids)
+        cache.set(DIRTY_KEY, dirty, timeout=None)
+
+
+def increment(post_id):
+    """Count one view of ``post_id``; flush the buffer once per interval."""
+    cache = _cache()
+    key = _key(post_id)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        count = cache.incr(key)
+    if count == 1:
+        _mark_dirty(cache, [post_id])
+
+    if cache.add(FLUSHED_KEY, 1, timeout=settings.VIEW_COUNT_FLUSH_INTERVAL):
+        flush()
+
+
+def reader(request):
+    """The client of ``request`` for ``count_view()``: address and user agent."""
+    meta = request.META
+    return f"{meta.get('REMOTE_ADDR', '')}:{meta.get('HTTP_USER_AGENT', '')}"
+
+
+def count_view(post_id, client):
+    """
+    Count a view of ``post_id`` by ``client`` (a string identifying the
+    reader) unless it was counted within the dedupe window, returns whether
+    it was counted.
+    """
+    digest = hashlib.md5(f"{client}:{post_id}".encode()).hexdigest()
+    if not _cache().add(
+        f"{KEY_PREFIX}:seen:{digest}", 1, timeout=settings.VIEW_COUNT_DEDUPE_WINDOW
+    ):
+        return False
+    increment(post_id)
+    return True
+
+
+def pending(post_id):
+    """Views of ``post_id`` not yet written to the database."""
+    return _cache().get(_key(post_id), 0)
+
+
+def flush():
+    """Write every pending delta to the database, returns the views written."""
+    cache = _cache()
+    with _dirty_lock(cache):
+        post_ids = cache.get(DIRTY_KEY, set())
+        cache.delete(DIRTY_KEY)
+    if not post_ids:
+        return 0
+
+    keys = {_key(post_id): post_id for post_id in post_ids}
+    deltas = defaultdict(list)  # {count: [post_id, ...]}
+    leftover = []
+    for key, count in cache.get_many(keys).items():
+        if not count:
+            continue
+        # views that arrived after get_many() stay in the buffer
+        if cache.decr(key, count) > 0:
+            leftover.append(keys[key])
+        deltas[count].append(keys[key])
+
+    try:
+        with transaction.atomic():
+            for count, ids in deltas.items():
+                Post.objects.filter(pk__in=ids).update(
+                    views_count=F("views_count") + count
+                )
+            views_flushed.send(
+                sender=Post,
+                views={
+                    post_id: count for count, ids in deltas.items() for post_id in ids
+                },
+            )
+    except Exception:
+        # put the counts back so the next flush retries them
+        for count, ids in deltas.items():
+            for post_id in ids:
+                cache.add(_key(post_id), 0, timeout=None)
+                cache.incr(_key(post_id), count)
+        _mark_dirty(cache, keys.values())
+        raise
+
+    if leftover:
+        _mark_dirty(cache, leftover)
+    return sum(count * len(ids) for count, ids in deltas.items())
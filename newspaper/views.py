@@ -1,12 +1,12 @@
-from datetime import timedelta
-
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -17,6 +17,9 @@ from django.views.generic import (
     View,
 )
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from rest_framework.request import Request
+
+from api.pagination import CommentCursorPagination
 from newspaper.forms import (
     CommentForm,
     ContactForm,
@@ -24,7 +27,11 @@ from newspaper.forms import (
     PostForm,
     CategoryForm,
 )
-from newspaper.models import Category, Post
+from newspaper import comment_queue, conditional, related, search, view_counter
+from newspaper.models import Category, NewsLetter, Post
+from newspaper.home_cache import bump_content_generation, home_context
+from newspaper.navigation_context_processor import get_navigation
+from newspaper.pagination import KeysetPaginationMixin
 
 # ORM => SQL query
 # Post.objects.all() => SELECT * FROM newspaper_post;
@@ -35,95 +42,103 @@ class CustomLogin(LoginView):
     template_name = "aznews/login.html"
 
 
-class HomeView(ListView):
-    model = Post
+class HomeView(TemplateView):
     template_name = "aznews/home.html"
-    context_object_name = "posts"
-    queryset = Post.objects.filter(
-        status="published", published_at__isnull=False
-    ).order_by("-published_at")[:5]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["featured_post"] = (
-            Post.objects.filter(status="published", published_at__isnull=False)
-            .order_by("-views_count")  # descending order
-            .first()
-        )
-        context["most_viewed_posts"] = Post.objects.filter(
-            status="published", published_at__isnull=False
-        ).order_by("-views_count")[:3]
-
-        one_week_ago = timezone.now() - timedelta(days=7)
-        context["weekly_top_posts"] = Post.objects.filter(
-            status="published",
-            published_at__isnull=False,
-            published_at__gte=one_week_ago,
-        ).order_by("-views_count")[:7]
-
+        context.update(home_context())
         return context
 
 
+def first_comment_page(request, post):
+    """
+    The latest comments of ``post`` and the link to the next page of the
+    comments API, which the "load more" button follows.
+    """
+    paginator = CommentCursorPagination()
+    comments = paginator.paginate_queryset(post.comment_set.all(), Request(request))
+    # relative, the page may be cached and served on any host
+    paginator.base_url = reverse("post-comment", args=[post.pk])
+    return comments, paginator.get_next_link()
+
+
+@method_decorator(
+    condition(
+        etag_func=conditional.post_detail_etag,
+        last_modified_func=conditional.post_detail_last_modified,
+    ),
+    name="get",
+)
 class PostDetailView(DetailView):
     model = Post
+    queryset = Post.objects.for_detail()
     template_name = "aznews/detail.html"
     context_object_name = "post"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        obj = self.get_object()
-        obj.views_count += 1
-        obj.save()
-
-        # detail => 5
-        # 4, 3, 2, 1
-        obj = self.get_object()
-        context["previous_post"] = (
-            Post.objects.filter(
-                id__lt=obj.id,
-                status="published",
-                published_at__isnull=False,
-            )
-            .order_by("-id")
-            .first()
+        obj = self.object
+
+        context["previous_post"] = context["next_post"] = None
+        if obj.published_at is not None:
+            for post in Post.objects.adjacent_to(obj):
+                if (post.published_at, post.pk) < (obj.published_at, obj.pk):
+                    context["previous_post"] = post
+                else:
+                    context["next_post"] = post
+        context["comments"], context["comments_next"] = first_comment_page(
+            self.request, obj
         )
-        # detail => 5
-        # 6, 7, 8, 9
-        context["next_post"] = (
-            Post.objects.filter(
-                id__gt=obj.id,
-                status="published",
-                published_at__isnull=False,
-            )
-            .order_by("id")
-            .first()
+        context["pending_comments"] = comment_queue.pending_comments(
+            self.request, obj.pk
         )
-        context["recent_posts"] = Post.objects.filter(
-            status="published", published_at__isnull=False
-        ).order_by("-published_at")[:4]
+        context["related_posts"] = related.related_posts(obj)
+        context["recent_posts"] = get_navigation()["recent_posts"]
         return context
 
 
-class PostListView(ListView):
+@method_decorator(csrf_exempt, name="dispatch")
+class PostViewCountView(View):
+    """
+    Beacon of the post detail page counting one view of a published post,
+    once per reader and ``settings.VIEW_COUNT_DEDUPE_WINDOW``.
+    """
+
+    def post(self, request, pk, *args, **kwargs):
+        published = Post.objects.filter(
+            pk=pk, status="published", published_at__isnull=False
+        )
+        if not published.exists():
+            raise Http404
+        view_counter.count_view(pk, view_counter.reader(request))
+        return HttpResponse(status=204)
+
+
+@method_decorator(
+    condition(
+        etag_func=conditional.post_list_etag,
+        last_modified_func=conditional.post_list_last_modified,
+    ),
+    name="get",
+)
+class PostListView(KeysetPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list.html"
     context_object_name = "posts"
     queryset = Post.objects.filter(
         status="published", published_at__isnull=False
-    ).order_by("-published_at")
-    paginate_by = 10
+    ).for_list()
 
 
 class PostSearchView(View):
     def get(self, request, *args, **kwargs):
-        query = request.GET["query"]
-        posts = Post.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        )
+        query = request.GET.get("query", "").strip()
+        posts = search.get_backend().search(query)
 
         page = request.GET.get("page", 1)
-        paginator = Paginator(posts, 1)
+        paginator = Paginator(posts, 10)
         try:
             page_obj = paginator.page(page)
         except PageNotAnInteger:
@@ -146,7 +161,7 @@ class NewsLetterView(View):
         if is_ajax == "XMLHttpRequest":
             form = self.form_class(request.POST)
             if form.is_valid():
-                form.save()
+                NewsLetter.objects.subscribe(form.cleaned_data["email"])
                 return JsonResponse(
                     {
                         "success": True,
@@ -173,11 +188,10 @@ class NewsLetterView(View):
             )
 
 
-class PostByCategory(ListView):
+class PostByCategory(KeysetPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list.html"
     context_object_name = "posts"
-    paginate_by = 10
 
     def get_queryset(self):
         super().get_queryset()
@@ -185,15 +199,14 @@ class PostByCategory(ListView):
             status="published",
             published_at__isnull=False,
             category=self.kwargs["cat_id"],
-        )
+        ).for_list()
         return queryset
 
 
-class PostByTag(ListView):
+class PostByTag(KeysetPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list.html"
     context_object_name = "posts"
-    paginate_by = 10
 
     def get_queryset(self):
         super().get_queryset()
@@ -201,7 +214,7 @@ class PostByTag(ListView):
             status="published",
             published_at__isnull=False,
             tag=self.kwargs["tag_id"],
-        )
+        ).for_list()
         return queryset
 
 
@@ -241,14 +254,20 @@ class CommentView(View):
 
         form = self.form_class(request.POST)
         if form.is_valid():
-            form.save()
+            comment_queue.enqueue(request, form.save(commit=False))
             return redirect("post-detail", post_id)
         else:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.for_detail().get(id=post_id)
+            comments, comments_next = first_comment_page(request, post)
             return render(
                 request,
                 self.template_name,
-                {"post": post, "form": form},
+                {
+                    "post": post,
+                    "form": form,
+                    "comments": comments,
+                    "comments_next": comments_next,
+                },
             )
 
 
@@ -256,7 +275,11 @@ class DraftListView(LoginRequiredMixin, ListView):
     model = Post
     template_name = "news_admin/post_list.html"
     context_object_name = "posts"
-    queryset = Post.objects.filter(published_at__isnull=True)
+    queryset = (
+        Post.objects.filter(published_at__isnull=True)
+        .for_list()
+        .select_related("author")
+    )
     paginate_by = 10
 
 
@@ -275,6 +298,7 @@ class PostDeleteView(LoginRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
         post = get_object_or_404(Post, pk=pk)
         post.delete()
+        bump_content_generation()
         return redirect("home")
 
 
@@ -284,6 +308,11 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
     template_name = "news_admin/post_create.html"
     success_url = reverse_lazy("home")
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        bump_content_generation()
+        return response
+
 
 class PostPublishView(LoginRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
@@ -291,6 +320,7 @@ class PostPublishView(LoginRequiredMixin, View):
         post.status = "published"
         post.published_at = timezone.now()
         post.save()
+        bump_content_generation()
         return redirect("home")
 
 
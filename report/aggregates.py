@@ -0,0 +1,151 @@
+"""
+Per category, author and tag report tables.
+
+``CategoryReport``, ``AuthorReport`` and ``TagReport`` hold the number of
+published posts, their views, comments and latest publication of every
+category, author and tag, so the editorial reports read a few indexed rows
+instead of grouping posts and comments online. ``refresh()`` (the
+``refresh_reports`` command, run on a schedule) computes again only the rows
+that may have changed since its last run:
+
+- rows ``report.signals`` marked stale when posts are saved, retagged or
+  deleted, or comments deleted,
+- rows of the posts commented on since the last comment seen,
+- rows of the posts viewed since the last ``PostViewBucket`` seen.
+
+New comments and views therefore cost nothing more on the request path.
+``refresh(full=True)``, and the first refresh, compute every row again.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from newspaper.models import Comment, Post
+from report.models import (
+    AuthorReport,
+    CategoryReport,
+    PostViewBucket,
+    ReportState,
+    StaleReport,
+    TagReport,
+)
+
+PostTag = Post.tag.through
+
+# kind -> (report model, its key field, the Post lookup grouped on)
+KINDS = {
+    "category": (CategoryReport, "category_id", "category"),
+    "author": (AuthorReport, "author_id", "author"),
+    "tag": (TagReport, "tag_id", "tag"),
+}
+
+
+def published_posts():
+    return Post.objects.filter(status="published", published_at__isnull=False)
+
+
+def keys_of_posts(post_ids):
+    """``{kind: {key}}`` of the rows the posts ``post_ids`` count in."""
+    keys = {kind: set() for kind in KINDS}
+    posts = Post.objects.filter(pk__in=post_ids).values_list("category", "author")
+    for category_id, author_id in posts:
+        keys["category"].add(category_id)
+        keys["author"].add(author_id)
+    keys["tag"].update(
+        PostTag.objects.filter(post__in=post_ids).values_list("tag_id", flat=True)
+    )
+    return keys
+
+
+def mark_stale(keys):
+    """Mark the rows ``{kind: keys}`` for the next refresh."""
+    StaleReport.objects.bulk_create(
+        [
+            StaleReport(kind=kind, key=key)
+            for kind, kind_keys in keys.items()
+            for key in kind_keys
+            if key is not None
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def compute(kind, keys=None):
+    """Report rows of ``kind`` for ``keys`` (all when None), not saved."""
+    model, key_field, lookup = KINDS[kind]
+    posts = published_posts().filter(**{f"{lookup}__isnull": False})
+    if keys is not None:
+        posts = posts.filter(**{f"{lookup}__in": keys})
+    rows = (
+        posts.values(lookup)
+        .annotate(
+            posts=Count("pk"),
+            views=Sum("views_count"),
+            comments=Sum("comment_count"),
+            last_published_at=Max("published_at"),
+        )
+        .order_by()
+    )
+    return [
+        model(
+            **{key_field: row[lookup]},
+            posts=row["posts"],
+            views=row["views"],
+            comments=row["comments"],
+            last_published_at=row["last_published_at"],
+        )
+        for row in rows
+    ]
+
+
+def store(kind, rows, keys=None):
+    model = KINDS[kind][0]
+    stale = model.objects.all()
+    if keys is not None:
+        stale = stale.filter(pk__in=keys)
+    stale.delete()
+    model.objects.bulk_create(rows, batch_size=500)
+
+
+@transaction.atomic
+def refresh(full=False):
+    """Bring the report rows up to date, returns ``{kind: rows computed}``."""
+    state, _ = ReportState.objects.select_for_update().get_or_create(pk=1)
+    full = full or state.refreshed_at is None
+    last_comment_id = Comment.objects.aggregate(last=Max("pk"))["last"] or 0
+    last_bucket_id = PostViewBucket.objects.aggregate(last=Max("pk"))["last"] or 0
+    last_stale_id = StaleReport.objects.aggregate(last=Max("pk"))["last"] or 0
+
+    if full:
+        keys = {kind: None for kind in KINDS}
+    else:
+        post_ids = set(
+            Comment.objects.filter(
+                pk__gt=state.last_comment_id, pk__lte=last_comment_id
+            ).values_list("post_id", flat=True)
+        )
+        post_ids.update(
+            PostViewBucket.objects.filter(
+                pk__gt=state.last_bucket_id, pk__lte=last_bucket_id
+            ).values_list("post_id", flat=True)
+        )
+        keys = keys_of_posts(post_ids)
+        for kind, key in StaleReport.objects.filter(pk__lte=last_stale_id).values_list(
+            "kind", "key"
+        ):
+            keys[kind].add(key)
+
+    computed = {}
+    for kind, kind_keys in keys.items():
+        if kind_keys is not None:
+            kind_keys = list(kind_keys)
+        rows = compute(kind, kind_keys)
+        store(kind, rows, kind_keys)
+        computed[kind] = len(rows)
+
+    StaleReport.objects.filter(pk__lte=last_stale_id).delete()
+    state.last_comment_id = last_comment_id
+    state.last_bucket_id = last_bucket_id
+    state.refreshed_at = timezone.now()
+    state.save()
+    return computed
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from report import store
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the hourly post views older than "
+        "REPORT_HOURLY_RETENTION_DAYS and the daily post views older than "
+        "REPORT_DAILY_RETENTION_DAYS. Days are rolled up first, so that no "
+        "hourly row goes before its day is counted."
+    )
+
+    def handle(self, *args, **options):
+        store.rollup()
+        hourly, daily = store.prune()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {hourly} hourly rows (older than "
+                f"{settings.REPORT_HOURLY_RETENTION_DAYS} days) and {daily} "
+                f"daily rows (older than {settings.REPORT_DAILY_RETENTION_DAYS} "
+                "days)."
+            )
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from report import aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the per category, author and tag report tables up to date. "
+        "Only the rows of posts changed, commented on or viewed since the "
+        "last run are computed again; schedule it every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Compute every row again.",
+        )
+
+    def handle(self, *args, **options):
+        computed = aggregates.refresh(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Refreshed "
+                + ", ".join(f"{count} {kind} rows" for kind, count in computed.items())
+                + "."
+            )
+        )
@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from report import store
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the hourly post view rows of past hours and roll complete "
+        "days up into the daily post views. Run it every hour or so."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Roll the days from this date (YYYY-MM-DD) up again "
+            "(default: from the last day rolled up).",
+        )
+
+    def handle(self, *args, **options):
+        removed = store.compact()
+        days = store.rollup(since=options["since"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Merged away {removed} hourly rows, rolled up {days} days."
+            )
+        )
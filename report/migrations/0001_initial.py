@@ -0,0 +1,78 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("newspaper", "0012_post_comment_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostViewBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("views", models.PositiveIntegerField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="newspaper.post"
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyPostViews",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("views", models.PositiveIntegerField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="newspaper.post"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="postviewbucket",
+            index=models.Index(
+                fields=["hour", "post", "views"], name="report_post_hour_3880c5_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailypostviews",
+            index=models.Index(
+                fields=["day", "post", "views"], name="report_dail_day_c9c8b3_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailypostviews",
+            constraint=models.UniqueConstraint(
+                fields=("post", "day"), name="unique_post_day"
+            ),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 4.1.5 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("newspaper", "0012_post_comment_count"),
+        ("report", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorReport",
+            fields=[
+                ("posts", models.PositiveIntegerField(default=0)),
+                ("views", models.PositiveBigIntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+                ("last_published_at", models.DateTimeField(null=True)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "author",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="post_report",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="CategoryReport",
+            fields=[
+                ("posts", models.PositiveIntegerField(default=0)),
+                ("views", models.PositiveBigIntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+                ("last_published_at", models.DateTimeField(null=True)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="report",
+                        serialize=False,
+                        to="newspaper.category",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ReportState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_comment_id", models.BigIntegerField(default=0)),
+                ("last_bucket_id", models.BigIntegerField(default=0)),
+                ("refreshed_at", models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StaleReport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=10)),
+                ("key", models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TagReport",
+            fields=[
+                ("posts", models.PositiveIntegerField(default=0)),
+                ("views", models.PositiveBigIntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+                ("last_published_at", models.DateTimeField(null=True)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="report",
+                        serialize=False,
+                        to="newspaper.tag",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name="tagreport",
+            index=models.Index(fields=["-views"], name="report_tagreport_views"),
+        ),
+        migrations.AddConstraint(
+            model_name="stalereport",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "key"), name="unique_stale_report"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="categoryreport",
+            index=models.Index(fields=["-views"], name="report_categoryreport_views"),
+        ),
+        migrations.AddIndex(
+            model_name="authorreport",
+            index=models.Index(fields=["-views"], name="report_authorreport_views"),
+        ),
+    ]
@@ -1,3 +1,107 @@
 from django.db import models
 
-# Create your models here.
+
+class PostViewBucket(models.Model):
+    """
+    Views of a post counted in one hour. Rows are only appended, one per
+    flush of the view counter; ``report.store.compact()`` merges the rows of
+    past hours into one.
+    """
+
+    post = models.ForeignKey("newspaper.Post", on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            # top posts of a window: range on hour, sum of views per post
+            models.Index(fields=["hour", "post", "views"]),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} @ {self.hour:%Y-%m-%d %H:00}: {self.views}"
+
+
+class DailyPostViews(models.Model):
+    """Views of a post in one day (UTC), rolled up from ``PostViewBucket``."""
+
+    post = models.ForeignKey("newspaper.Post", on_delete=models.CASCADE)
+    day = models.DateField()
+    views = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "day"], name="unique_post_day"),
+        ]
+        indexes = [
+            models.Index(fields=["day", "post", "views"]),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} @ {self.day}: {self.views}"
+
+
+class ReportRow(models.Model):
+    """Traffic and comments of the published posts of one category/author/tag."""
+
+    posts = models.PositiveIntegerField(default=0)
+    views = models.PositiveBigIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    last_published_at = models.DateTimeField(null=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=["-views"], name="%(app_label)s_%(class)s_views"),
+        ]
+
+
+class CategoryReport(ReportRow):
+    category = models.OneToOneField(
+        "newspaper.Category",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="report",
+    )
+
+
+class AuthorReport(ReportRow):
+    author = models.OneToOneField(
+        "auth.User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="post_report",
+    )
+
+
+class TagReport(ReportRow):
+    tag = models.OneToOneField(
+        "newspaper.Tag",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="report",
+    )
+
+
+class StaleReport(models.Model):
+    """A report row to compute again, marked by ``report.signals``."""
+
+    kind = models.CharField(max_length=10)
+    key = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="unique_stale_report"),
+        ]
+
+
+class ReportState(models.Model):
+    """
+    The single row of the report refresh: the comments and view buckets
+    already accounted for.
+    """
+
+    last_comment_id = models.BigIntegerField(default=0)
+    last_bucket_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True)
@@ -0,0 +1,46 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from newspaper.models import Comment, Post
+from newspaper.view_counter import views_flushed
+from report import aggregates, store
+
+
+@receiver(views_flushed)
+def record_flushed_views(sender, views, **kwargs):
+    store.record(views)
+
+
+@receiver(post_save, sender=Post)
+def mark_saved_post_reports(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    keys = aggregates.keys_of_posts([instance.pk])
+    # set by newspaper.signals when the post moves to another category
+    keys["category"].add(getattr(instance, "_previous_category_id", None))
+    aggregates.mark_stale(keys)
+
+
+@receiver(pre_delete, sender=Post)
+def mark_deleted_post_reports(sender, instance, **kwargs):
+    aggregates.mark_stale(aggregates.keys_of_posts([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def mark_retagged_post_reports(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        tag_ids = [instance.pk]
+    elif action == "pre_clear":
+        tag_ids = list(instance.tag.values_list("pk", flat=True))
+    else:
+        tag_ids = pk_set or ()
+    aggregates.mark_stale({"tag": tag_ids})
+
+
+@receiver(post_delete, sender=Comment)
+def mark_uncommented_post_reports(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Post):
+        return  # marked with the post
+    aggregates.mark_stale(aggregates.keys_of_posts([instance.post_id]))
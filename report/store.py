@@ -0,0 +1,167 @@
+"""
+Post views per hour and per day.
+
+Every flush of ``newspaper.view_counter`` appends the views it writes to
+``PostViewBucket``, one row per post for the current hour, in the same
+transaction; nothing is ever updated in place on the view path. Jobs (see the
+``rollup_post_views`` and ``prune_post_views`` commands) then:
+
+- ``compact()`` the rows of every past hour into one per post,
+- ``rollup()`` complete days into ``DailyPostViews``,
+- ``prune()`` hourly rows after ``REPORT_HOURLY_RETENTION_DAYS`` and daily
+  rows after ``REPORT_DAILY_RETENTION_DAYS``.
+
+``top_post_views()`` ranks posts by their views in a window, from the hourly
+rows when the window is within their retention and from the daily rows
+(complete days only) otherwise; both are covering index range scans.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from newspaper.models import Post
+from report.models import DailyPostViews, PostViewBucket
+
+
+def hour_of(at):
+    return at.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def start_of(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def hourly_horizon(now=None):
+    """Views before this moment may be gone from the hourly rows."""
+    now = now or timezone.now()
+    return hour_of(now) - timedelta(days=settings.REPORT_HOURLY_RETENTION_DAYS)
+
+
+def record(views, at=None):
+    """Append ``views`` (``{post id: views}``) to the hour of ``at``."""
+    hour = hour_of(at or timezone.now())
+    PostViewBucket.objects.bulk_create(
+        PostViewBucket(post_id=post_id, hour=hour, views=count)
+        for post_id, count in views.items()
+        if count > 0
+    )
+
+
+def compact(now=None):
+    """Merge the rows of every post in each past hour, returns rows removed."""
+    current_hour = hour_of(now or timezone.now())
+    groups = (
+        PostViewBucket.objects.filter(hour__lt=current_hour)
+        .values("post", "hour")
+        .annotate(rows=Count("pk"), views=Sum("views"), last=Max("pk"))
+        .filter(rows__gt=1)
+    )
+    removed = 0
+    for group in groups.iterator():
+        with transaction.atomic():
+            # rows appended since the groups were read stay as they are
+            removed += PostViewBucket.objects.filter(
+                post=group["post"], hour=group["hour"], pk__lte=group["last"]
+            ).delete()[0]
+            PostViewBucket.objects.create(
+                post_id=group["post"], hour=group["hour"], views=group["views"]
+            )
+            removed -= 1
+    return removed
+
+
+def rollup(since=None, now=None):
+    """
+    Write the ``DailyPostViews`` of every complete day from ``since`` (by
+    default the last day rolled up, which may have received late rows) on,
+    returns the number of days.
+    """
+    today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+    first = PostViewBucket.objects.aggregate(first=Min("hour"))["first"]
+    if first is None:
+        return 0
+    # days before the oldest hourly row are pruned, keep their daily rows
+    first_day = first.astimezone(dt_timezone.utc).date()
+    if (
+        first > start_of(first_day)
+        and DailyPostViews.objects.filter(day=first_day).exists()
+    ):
+        first_day += timedelta(days=1)  # partly pruned too
+    if since is None:
+        since = DailyPostViews.objects.aggregate(last=Max("day"))["last"]
+    since = max(since or first_day, first_day)
+    days = 0
+    day = since
+    while day < today:
+        rows = (
+            PostViewBucket.objects.filter(
+                hour__gte=start_of(day), hour__lt=start_of(day + timedelta(days=1))
+            )
+            .values("post")
+            .annotate(views=Sum("views"))
+            .values_list("post", "views")
+        )
+        with transaction.atomic():
+            DailyPostViews.objects.filter(day=day).delete()
+            DailyPostViews.objects.bulk_create(
+                DailyPostViews(post_id=post_id, day=day, views=views)
+                for post_id, views in rows
+            )
+        days += 1
+        day += timedelta(days=1)
+    return days
+
+
+def prune(now=None):
+    """
+    Delete the hourly and daily rows past their retention, returns the
+    number of hourly and of daily rows deleted.
+    """
+    now = now or timezone.now()
+    hourly, _ = PostViewBucket.objects.filter(hour__lt=hourly_horizon(now)).delete()
+    oldest_day = now.astimezone(dt_timezone.utc).date() - timedelta(
+        days=settings.REPORT_DAILY_RETENTION_DAYS
+    )
+    daily, _ = DailyPostViews.objects.filter(day__lt=oldest_day).delete()
+    return hourly, daily
+
+
+def top_post_views(since, limit=10, posts=None, now=None):
+    """
+    ``[(post id, views)]`` of the ``limit`` posts most viewed since ``since``,
+    most viewed first; ``posts`` restricts the ranking to a queryset of posts.
+    """
+    if since >= hourly_horizon(now):
+        rows = PostViewBucket.objects.filter(hour__gte=hour_of(since))
+    else:
+        day = since.astimezone(dt_timezone.utc).date()
+        rows = DailyPostViews.objects.filter(day__gte=day)
+    if posts is not None:
+        rows = rows.filter(post__in=posts.values("pk"))
+    return list(
+        rows.values("post")
+        .annotate(total=Sum("views"))
+        .order_by("-total", "-post")
+        .values_list("post", "total")[:limit]
+    )
+
+
+def top_posts(window=timedelta(days=1), limit=10, now=None):
+    """
+    The ``limit`` published posts most viewed in the last ``window``, with
+    their views in ``post.recent_views``.
+    """
+    now = now or timezone.now()
+    published = Post.objects.filter(status="published", published_at__isnull=False)
+    ranked = top_post_views(now - window, limit, posts=published, now=now)
+    posts = published.for_list().in_bulk([post_id for post_id, _ in ranked])
+    result = []
+    for post_id, views in ranked:
+        post = posts.get(post_id)
+        if post is not None:
+            post.recent_views = views
+            result.append(post)
+    return result
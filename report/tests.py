@@ -1,3 +1,92 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from newspaper import view_counter
+from newspaper.models import Category, Comment
+from newspaper.tests import make_post
+from report import aggregates, store
+from report.models import CategoryReport, DailyPostViews, PostViewBucket
+
+
+class ViewStoreTests(TestCase):
+    def setUp(self):
+        self.posts = [make_post(f"post {i}") for i in range(3)]
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_flushed_views_are_bucketed_by_hour(self):
+        first, second, _ = self.posts
+        for post in [first, second, second]:
+            view_counter.increment(post.pk)
+        view_counter.flush()
+        view_counter.increment(second.pk)
+        view_counter.flush()
+
+        self.assertEqual(PostViewBucket.objects.count(), 3)
+        ranked = store.top_posts(window=timedelta(hours=1))
+        self.assertEqual([post.recent_views for post in ranked], [3, 1])
+        self.assertEqual(ranked[0], second)
+
+    def test_compact_rollup_and_prune(self):
+        first, second, _ = self.posts
+        now = datetime(2026, 3, 10, 12, 30, tzinfo=dt_timezone.utc)
+        yesterday = now - timedelta(days=1)
+        store.record({first.pk: 2, second.pk: 1}, at=yesterday)
+        store.record({second.pk: 4}, at=yesterday)
+        store.record({first.pk: 1}, at=now)
+
+        self.assertEqual(store.compact(now=now), 1)
+        self.assertEqual(store.rollup(now=now), 1)
+        self.assertEqual(
+            set(DailyPostViews.objects.values_list("post", "day", "views")),
+            {(first.pk, yesterday.date(), 2), (second.pk, yesterday.date(), 5)},
+        )
+        # windows beyond the hourly retention are read from the daily rows
+        ranked = store.top_post_views(now - timedelta(days=30), now=now)
+        self.assertEqual(ranked, [(second.pk, 5), (first.pk, 2)])
+
+        self.assertEqual(store.prune(now=now + timedelta(days=15)), (3, 0))
+        self.assertEqual(DailyPostViews.objects.count(), 2)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="editor")
+        self.staff = User.objects.create_user(username="boss", is_staff=True)
+        self.politics = Category.objects.create(name="politics")
+        self.sports = Category.objects.create(name="sports")
+        self.post = make_post(author=self.author, category=self.politics)
+        aggregates.refresh()
+
+    def test_refresh_computes_the_changed_rows_only(self):
+        Comment.objects.create(
+            post=self.post, name="reader", email="r@example.com", message="hi"
+        )
+        self.assertEqual(aggregates.refresh(), {"category": 1, "author": 1, "tag": 0})
+        self.assertEqual(CategoryReport.objects.get(pk=self.politics).comments, 1)
+
+        self.post.category = self.sports
+        self.post.save()
+        aggregates.refresh()
+        self.assertEqual(
+            list(CategoryReport.objects.values_list("category", "posts")),
+            [(self.sports.pk, 1)],
+        )
+        self.assertEqual(aggregates.refresh(), {"category": 0, "author": 0, "tag": 0})
+
+    def test_reports_are_for_staff_only(self):
+        csv_url = reverse("report-csv", args=["categories"])
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(csv_url).status_code, 403)
+        self.assertEqual(self.client.get("/api/v1/reports/").status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(csv_url)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines()[1],
+            f"{self.politics.pk},politics,1,0,0,{self.post.published_at}",
+        )
+        response = self.client.get("/api/v1/reports/categories/")
+        self.assertEqual(response.json()["results"][0]["name"], "politics")
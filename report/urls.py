@@ -0,0 +1,16 @@
+from django.urls import path
+
+from report import views
+
+urlpatterns = [
+    path(
+        "<str:kind>.csv",
+        views.ReportCSVView.as_view(),
+        name="report-csv",
+    ),
+    path(
+        "<str:kind>/",
+        views.ReportView.as_view(),
+        name="report",
+    ),
+]
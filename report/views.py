@@ -1,3 +1,55 @@
-from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404
+from django.views.generic import ListView, View
 
-# Create your views here.
+from newspaper.exports import csv_response
+from report.models import AuthorReport, CategoryReport, ReportState, TagReport
+
+# url kind -> (title, report model, its key field, the name shown)
+REPORTS = {
+    "categories": ("Categories", CategoryReport, "category", "category__name"),
+    "authors": ("Authors", AuthorReport, "author", "author__username"),
+    "tags": ("Tags", TagReport, "tag", "tag__name"),
+}
+COLUMNS = ["posts", "views", "comments", "last_published_at"]
+
+
+class StaffRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class ReportMixin(StaffRequiredMixin):
+    def get_report(self):
+        try:
+            return REPORTS[self.kwargs["kind"]]
+        except KeyError:
+            raise Http404
+
+    def get_queryset(self):
+        _, model, key, _ = self.get_report()
+        return model.objects.select_related(key).order_by("-views", "pk")
+
+
+class ReportView(ReportMixin, ListView):
+    template_name = "news_admin/report.html"
+    context_object_name = "rows"
+    paginate_by = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["kind"] = self.kwargs["kind"]
+        context["reports"] = {kind: report[0] for kind, report in REPORTS.items()}
+        context["state"] = ReportState.objects.first()
+        return context
+
+
+class ReportCSVView(ReportMixin, View):
+    def get(self, request, kind, *args, **kwargs):
+        _, _, _, name = self.get_report()
+        rows = (
+            self.get_queryset()
+            .values_list("pk", name, *COLUMNS)
+            .iterator(chunk_size=2000)
+        )
+        return csv_response(f"{kind}.csv", ["id", "name", *COLUMNS], rows)